@@ -0,0 +1,37 @@
+class Aggregates:
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.employees = 0
+        self.active_employees = 0
+        self.tasks = 0
+        self.task_statuses = {}
+        self.events = 0
+        self.documents = 0
+        self.documents_size = 0
+
+    def count_employee(self, employee, delta):
+        self.employees += delta
+        if employee.status == "Активен":
+            self.active_employees += delta
+
+    def count_task(self, task, delta):
+        self.tasks += delta
+        status = task.status
+        count = self.task_statuses.get(status, 0) + delta
+        if count:
+            self.task_statuses[status] = count
+        else:
+            self.task_statuses.pop(status, None)
+
+    def count_event(self, event, delta):
+        self.events += delta
+
+    def count_document(self, doc, delta):
+        self.documents += delta
+        self.documents_size += (doc.size or 0) * delta
+
+    def completed_tasks(self):
+        return self.task_statuses.get("Завершено", 0)
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codec import CODECS, create_codec
+from storage import COLLECTION_FILES, JsonStorage
+
+from generate_data import generate
+
+
+EMPLOYEES = 100000
+REPEATS = 3
+
+
+def available_codecs():
+    codecs = []
+    for name in CODECS:
+        for compact in (False, True):
+            try:
+                codecs.append(create_codec(name, compact))
+            except ImportError:
+                print(f"{name}: библиотека не установлена, пропущено")
+                break
+    return codecs
+
+
+def best_time(action):
+    times = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def run(data):
+    print(f"{'кодек':<10}{'режим':<10}{'сохранение, с':>15}{'загрузка, с':>14}{'размер, МБ':>13}")
+    for codec in available_codecs():
+        with tempfile.TemporaryDirectory() as folder:
+            storage = JsonStorage(folder, codec=codec)
+
+            def save():
+                for collection in COLLECTION_FILES:
+                    storage.save(collection, data[collection])
+
+            save_time = best_time(save)
+            load_time = best_time(storage.load)
+            if storage.load() != data:
+                raise AssertionError(f"{codec.name}: данные не совпадают")
+
+            size = sum(
+                os.path.getsize(storage.path(collection))
+                for collection in COLLECTION_FILES)
+            mode = "compact" if codec.compact else "indent"
+            print(f"{codec.name:<10}{mode:<10}{save_time:>15.3f}{load_time:>14.3f}"
+                  f"{size / 1024 / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else EMPLOYEES
+    print(f"Генерация данных: {employees} сотрудников")
+    run(generate(employees, history_depth=5))
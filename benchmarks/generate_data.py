@@ -0,0 +1,159 @@
+import argparse
+import os
+import random
+import sys
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import COLLECTION_FILES, JsonStorage, move_embedded_history
+
+
+SCALES = {
+    "small": 1000,
+    "medium": 10000,
+    "large": 100000,
+}
+
+FIRST_NAMES = [
+    "Александр", "Мария", "Дмитрий", "Анна", "Сергей", "Елена", "Андрей",
+    "Ольга", "Алексей", "Наталья", "Иван", "Татьяна", "Михаил", "Ирина",
+]
+LAST_NAMES = [
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров",
+    "Соколов", "Михайлов", "Новиков", "Федоров", "Морозов", "Волков",
+]
+POSITIONS = [
+    "Бухгалтер", "Инженер", "Менеджер", "Аналитик", "Юрист", "Кладовщик",
+    "Программист", "Тестировщик", "Секретарь", "Водитель", "Дизайнер",
+    "Специалист по кадрам", "Руководитель отдела", "Экономист",
+]
+TASK_WORDS = [
+    "отчет", "договор", "инвентаризация", "бюджет", "приказ", "закупка",
+    "проверка", "совещание", "обучение", "аудит", "релиз", "поставка",
+]
+STATUSES = ["К выполнению", "В процессе", "Завершено"]
+PRIORITIES = ["Низкий", "Средний", "Высокий", "Критичный"]
+DOCUMENT_TYPES = [".txt", ".pdf", ".docx", ".xlsx", ".csv", ".png"]
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def task_text(rng):
+    return " ".join(rng.choice(TASK_WORDS) for _ in range(rng.randint(2, 5))).capitalize()
+
+
+def random_moment(rng, start, days):
+    moment = start + timedelta(days=rng.randrange(days), hours=rng.randint(8, 18))
+    return moment.replace(minute=rng.choice((0, 15, 30, 45)))
+
+
+def generate(employees, seed=1, history_depth=20, tasks_per_employee=2,
+             event_years=3, documents=None, now=None):
+    rng = random.Random(seed)
+    now = now or datetime(2026, 1, 1, 9, 0)
+    history_start = now - timedelta(days=365 * 5)
+    documents = employees // 10 if documents is None else documents
+
+    staff = []
+    for i in range(employees):
+        # Стаж разный: у части сотрудников история задач очень длинная
+        depth = min(int(rng.expovariate(1 / history_depth)), history_depth * 10)
+        history = []
+        for _ in range(depth):
+            started = random_moment(rng, history_start, 365 * 5)
+            history.append({
+                "task": task_text(rng),
+                "start_date": started.strftime(TIME_FORMAT),
+                "end_date": (started + timedelta(days=rng.randint(1, 60))).strftime(TIME_FORMAT),
+                "type": "смена",
+            })
+        history.sort(key=lambda entry: entry["start_date"])
+        birth = datetime(1960, 1, 1) + timedelta(days=rng.randrange(365 * 40))
+        staff.append({
+            "id": f"{rng.getrandbits(32):08x}{i:x}",
+            "full_name": f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {i}",
+            "birth_date": birth.strftime("%Y-%m-%d"),
+            "position": rng.choice(POSITIONS),
+            "current_task": task_text(rng),
+            "task_history": history,
+            "status": "Активен" if rng.random() < 0.9 else "Уволен",
+        })
+
+    tasks = []
+    for i in range(employees * tasks_per_employee):
+        assignee = rng.choice(staff)
+        created = random_moment(rng, history_start, 365 * 5)
+        tasks.append({
+            "id": i + 1,
+            "text": task_text(rng),
+            "assignee_id": assignee["id"],
+            "assignee_name": assignee["full_name"],
+            "status": rng.choice(STATUSES),
+            "priority": rng.choice(PRIORITIES),
+            "created": created.strftime(TIME_FORMAT),
+            "deadline": (created + timedelta(days=rng.randint(1, 90))).strftime(TIME_FORMAT)
+            if rng.random() < 0.5 else None,
+        })
+
+    # События за несколько лет вокруг текущей даты, включая будущие
+    events = {}
+    events_start = now - timedelta(days=365 * (event_years - 1))
+    for i in range(employees):
+        assignee = rng.choice(staff)
+        task = rng.choice(tasks) if tasks and rng.random() < 0.5 else None
+        moment = random_moment(rng, events_start, 365 * event_years)
+        date = moment.strftime("%Y-%m-%d")
+        date_events = events.setdefault(date, [])
+        date_events.append({
+            "id": len(date_events) + 1,
+            "title": task_text(rng),
+            "description": task_text(rng),
+            "task_id": task["id"] if task else None,
+            "task_name": task["text"] if task else "",
+            "assignee_id": assignee["id"],
+            "assignee_name": assignee["full_name"],
+            "time": moment.strftime("%H:%M"),
+            "datetime": moment.strftime(TIME_FORMAT),
+            "created": (moment - timedelta(days=rng.randint(1, 30))).strftime(TIME_FORMAT),
+        })
+
+    docs = []
+    for i in range(documents):
+        doc_type = rng.choice(DOCUMENT_TYPES)
+        name = f"{rng.choice(TASK_WORDS)}_{i}{doc_type}"
+        docs.append({
+            "name": name,
+            "path": os.path.join("documents", name),
+            "size": int(rng.lognormvariate(11, 1.5)),
+            "modified": random_moment(rng, history_start, 365 * 5).strftime(TIME_FORMAT),
+            "type": doc_type,
+        })
+
+    return {"employees": staff, "tasks": tasks, "events": events, "documents": docs}
+
+
+def write(data, data_dir):
+    # История задач пишется в отдельное хранилище, как у приложения
+    storage = JsonStorage(data_dir)
+    move_embedded_history(data["employees"], storage.history)
+    storage.history.close()
+    for collection in COLLECTION_FILES:
+        storage.save(collection, data[collection])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Генерация тестовых данных в формате data/*.json")
+    parser.add_argument("--scale", choices=SCALES, default="medium")
+    parser.add_argument("--employees", type=int,
+                        help="число сотрудников вместо --scale")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--history-depth", type=int, default=20,
+                        help="средняя длина истории задач")
+    parser.add_argument("--output", default="data")
+    args = parser.parse_args()
+
+    employees = args.employees or SCALES[args.scale]
+    write(generate(employees, args.seed, args.history_depth), args.output)
+    print(f"Сгенерировано сотрудников: {employees} в {args.output}")
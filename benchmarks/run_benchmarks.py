@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from generate_data import SCALES, generate, write
+
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+STAFF_QUERIES = ["и", "ив", "ива", "иван", "иванов", "бухгалтер", "отчет"]
+
+
+def measure(action, repeats, setup=None):
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        action()
+        times.append((time.perf_counter() - started) * 1000)
+    return summarize(times)
+
+
+def summarize(times):
+    return {
+        "runs_ms": [round(t, 3) for t in times],
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def cold_start():
+    # Отдельный процесс: окно создается и ждет данных, как при запуске
+    started = time.perf_counter()
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication([])
+    import guiqt
+    guiqt.EventNotifier.show_notification = lambda self, date_str, event: None
+
+    window = guiqt.MainWindow()
+    window.show()
+    while not any(stage == "первая страница" for stage, _ in window.startup_times):
+        app.processEvents()
+        time.sleep(0.001)
+    total = (time.perf_counter() - started) * 1000
+    print(json.dumps({
+        "total_ms": total,
+        "stages": dict(window.startup_times),
+    }))
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def measure_cold_start(workdir, repeats):
+    times = []
+    stages = None
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cold-start"],
+            cwd=workdir, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["total_ms"])
+        stages = result["stages"]
+    summary = summarize(times)
+    summary["last_stages_ms"] = {k: round(v, 3) for k, v in stages.items()}
+    return summary
+
+
+def run_suite(repeats):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+
+    from datamanager import DataManager
+    from guiqt import CalendarPage, DashboardPage, EventNotifier, StaffPage, TodoPage
+    from storage import COLLECTION_FILES
+
+    results = {}
+    data_manager = DataManager()
+
+    def mark_all_dirty():
+        data_manager.mark_dirty(*COLLECTION_FILES)
+
+    results["DataManager.load_all_data"] = measure(
+        data_manager.load_all_data, repeats)
+    results["DataManager.save_all_data"] = measure(
+        data_manager.save_all_data, repeats, setup=mark_all_dirty)
+
+    staff_page = StaffPage(data_manager)
+
+    def staff_filter():
+        for query in STAFF_QUERIES:
+            staff_page.search_input.setText(query)
+            staff_page.filter_table()
+
+    def staff_reset():
+        staff_page.search_input.setText("")
+        staff_page.filter_table()
+
+    results["StaffPage.update_table"] = measure(
+        staff_page.update_table, repeats, setup=staff_reset)
+    results["StaffPage.filter_table"] = measure(
+        staff_filter, repeats, setup=staff_reset)
+
+    todo_page = TodoPage(data_manager)
+    assignee = data_manager.employees[0]["full_name"] if data_manager.employees else ""
+
+    def set_todo_filters(status, assignee_name, priority):
+        for combo, text in (
+            (todo_page.filter_status, status),
+            (todo_page.filter_assignee, assignee_name),
+            (todo_page.filter_priority, priority),
+        ):
+            combo.blockSignals(True)
+            combo.setCurrentText(text)
+            combo.blockSignals(False)
+
+    def todo_filter():
+        for filters in (
+            ("В процессе", "Все исполнители", "Все приоритеты"),
+            ("В процессе", "Все исполнители", "Высокий"),
+            ("Все статусы", assignee, "Все приоритеты"),
+            ("Все статусы", "Все исполнители", "Все приоритеты"),
+        ):
+            set_todo_filters(*filters)
+            todo_page.filter_tasks()
+
+    results["TodoPage.update_list"] = measure(todo_page.update_list, repeats)
+    results["TodoPage.filter_tasks"] = measure(todo_filter, repeats)
+
+    notifier = EventNotifier(data_manager)
+    notifier.show_notification = lambda date_str, event: None
+    results["EventNotifier.schedule_reminders"] = measure(
+        notifier.schedule_reminders, repeats)
+    results["EventNotifier.check_notifications"] = measure(
+        notifier.check_notifications, repeats)
+
+    calendar_page = CalendarPage(data_manager)
+    results["CalendarPage.update_month_view"] = measure(
+        calendar_page.update_month_view, repeats)
+    results["CalendarPage.show_events"] = measure(
+        calendar_page.show_events, repeats)
+
+    # Последним: каждая новая страница подписывается на изменения данных
+    dashboards = []
+    results["DashboardPage.__init__"] = measure(
+        lambda: dashboards.append(DashboardPage(data_manager)), repeats)
+
+    app.processEvents()
+    return results
+
+
+def compare(previous_path, current):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)["results"]
+    print(f"\n{'операция':<40}{'было, мс':>12}{'стало, мс':>12}{'разница':>10}")
+    for name, result in current.items():
+        if name not in previous:
+            continue
+        before = previous[name]["median_ms"]
+        after = result["median_ms"]
+        ratio = f"{after / before:.2f}x" if before else "-"
+        print(f"{name:<40}{before:>12.1f}{after:>12.1f}{ratio:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Замеры производительности на сгенерированных данных")
+    parser.add_argument("--scale", choices=SCALES, default="medium")
+    parser.add_argument("--employees", type=int,
+                        help="число сотрудников вместо --scale")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="файл для результатов (JSON)")
+    parser.add_argument("--compare", help="сравнить с прошлым результатом")
+    parser.add_argument("--keep", action="store_true",
+                        help="не удалять рабочую папку с данными")
+    parser.add_argument("--cold-start", action="store_true",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start:
+        cold_start()
+
+    employees = args.employees or SCALES[args.scale]
+    workdir = tempfile.mkdtemp(prefix="hrms-bench-")
+    print(f"Генерация данных: {employees} сотрудников в {workdir}")
+    write(generate(employees, args.seed, now=datetime.now()),
+          os.path.join(workdir, "data"))
+
+    results = {}
+    try:
+        results["MainWindow.cold_start"] = measure_cold_start(
+            workdir, min(args.repeats, 3))
+        os.chdir(workdir)
+        results.update(run_suite(args.repeats))
+    finally:
+        os.chdir(ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    from codec import create_codec
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "employees": employees,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_codec": create_codec().name,
+            "storage": os.environ.get("HRMS_STORAGE", "json"),
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"bench-{employees}-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, result in results.items():
+        print(f"{name:<40}{result['median_ms']:>12.1f} мс")
+    print(f"Результаты: {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
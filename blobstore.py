@@ -0,0 +1,89 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+
+BLOBS_DIR = ".blobs"
+CHUNK_SIZE = 1024 * 1024
+FICLONE = 0x40049409
+
+
+class BlobStore:
+
+    def __init__(self, documents_folder):
+        self.root = os.path.join(documents_folder, BLOBS_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def contains(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, source_path):
+        # Повторный импорт того же содержимого обходится без копирования
+        digest = file_digest(source_path)
+        blob_path = self.path(digest)
+        if not os.path.exists(blob_path):
+            self._write(blob_path, lambda tmp_path: clone_file(source_path, tmp_path))
+        return digest, blob_path
+
+    def put_bytes(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self.path(digest)
+        if not os.path.exists(blob_path):
+            def write(tmp_path):
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+            self._write(blob_path, write)
+        return digest, blob_path
+
+    def remove(self, digest):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    def checkout(self, digest, name):
+        # Внешним программам нужен файл с исходным именем и расширением
+        folder = os.path.join(tempfile.gettempdir(), "hrms-documents")
+        os.makedirs(folder, exist_ok=True)
+        target = os.path.join(folder, name)
+        clone_file(self.path(digest), target)
+        return target
+
+    def _write(self, blob_path, fill):
+        folder = os.path.dirname(blob_path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        os.close(fd)
+        try:
+            fill(tmp_path)
+            os.replace(tmp_path, blob_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def clone_file(source_path, target_path):
+    # На Btrfs/XFS копия делается ссылкой на те же блоки (reflink)
+    if sys.platform.startswith("linux"):
+        try:
+            import fcntl
+            with open(source_path, "rb") as src, open(target_path, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source_path, target_path)
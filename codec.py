@@ -0,0 +1,121 @@
+import gc
+import json
+import os
+
+from contextlib import contextmanager
+
+
+# Порядок, в котором выбирается библиотека при HRMS_JSON_CODEC=auto
+CODEC_PREFERENCE = ("orjson", "msgspec", "json")
+
+
+class JsonCodec:
+    name = "json"
+
+    def __init__(self, compact=False):
+        self.compact = compact
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, value):
+        return json.dumps(value, ensure_ascii=False)
+
+    def decode_file(self, data):
+        with paused_gc():
+            return self.loads(data)
+
+    def encode_file(self, payload):
+        # Файлы данных: с отступами, как раньше, или одной строкой
+        if self.compact:
+            text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        else:
+            text = json.dumps(payload, ensure_ascii=False, indent=2)
+        return text.encode("utf-8")
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self, compact=False):
+        import orjson
+        super().__init__(compact)
+        self.orjson = orjson
+        # Нестроковые ключи stdlib json превращает в строки; делаем так же
+        self.options = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+    def dumps(self, value):
+        return self.orjson.dumps(value, option=self.options).decode("utf-8")
+
+    def encode_file(self, payload):
+        options = self.options
+        if not self.compact:
+            options |= self.orjson.OPT_INDENT_2
+        return self.orjson.dumps(payload, option=options)
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self, compact=False):
+        import msgspec
+        super().__init__(compact)
+        self.msgspec = msgspec
+        self.encoder = msgspec.json.Encoder()
+        self.decoder = msgspec.json.Decoder()
+
+    def loads(self, data):
+        try:
+            return self.decoder.decode(data)
+        except self.msgspec.DecodeError as e:
+            # Остальной код ждет ValueError, как от json.loads
+            raise ValueError(str(e)) from e
+
+    def dumps(self, value):
+        return self.encoder.encode(value).decode("utf-8")
+
+    def encode_file(self, payload):
+        data = self.encoder.encode(payload)
+        if self.compact:
+            return data
+        return self.msgspec.json.format(data, indent=2)
+
+
+@contextmanager
+def paused_gc():
+    # Разбор большого файла создает миллионы объектов; сборщик мусора
+    # на это время отключается, чтобы не обходить их снова и снова
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+CODECS = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+}
+
+
+def create_codec(backend=None, compact=None):
+    backend = backend or os.environ.get("HRMS_JSON_CODEC", "auto")
+    if compact is None:
+        compact = os.environ.get("HRMS_JSON_COMPACT", "") not in ("", "0")
+
+    if backend == "auto":
+        for name in CODEC_PREFERENCE:
+            try:
+                return CODECS[name](compact)
+            except ImportError:
+                continue
+
+    if backend not in CODECS:
+        raise ValueError(f"Неизвестный JSON-кодек: {backend}")
+    return CODECS[backend](compact)
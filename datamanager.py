@@ -1,75 +1,567 @@
-import os
-import json
+import threading
+
+from aggregates import Aggregates
+from codec import create_codec, paused_gc
+from eventindex import EventTimeline
+from instrumentation import timed
+from records import (
+    CalendarEvent,
+    Document,
+    Employee,
+    Task,
+    TaskHistoryEntry,
+    from_collection,
+    to_plain,
+)
+from searchindex import SearchIndex
+from storage import (
+    COLLECTION_FILES,
+    JsonStorage,
+    create_storage,
+    empty_collection,
+    move_embedded_history,
+)
+
+
+JOURNAL_COMPACT_RECORDS = 500
 
 
 class DataManager:
     _instance = None
 
-    def __new__(cls):
+    def __new__(cls, defer_load=False):
         if cls._instance is None:
             cls._instance = super(DataManager, cls).__new__(cls)
             cls._instance.employees = []
             cls._instance.tasks = []
             cls._instance.events = {}
             cls._instance.documents = []
-            cls._instance.load_all_data()
+            cls._instance.dirty = {}
+            cls._instance.employees_by_id = {}
+            cls._instance.employees_by_name = {}
+            cls._instance.tasks_by_id = {}
+            cls._instance.tasks_by_assignee = {}
+            cls._instance.tasks_by_status = {}
+            cls._instance.tasks_by_priority = {}
+            cls._instance.events_by_assignee = {}
+            cls._instance.documents_by_name = {}
+            cls._instance.documents_by_hash = {}
+            cls._instance.documents_by_path = {}
+            cls._instance.event_timeline = EventTimeline()
+            cls._instance.aggregates = Aggregates()
+            cls._instance.employee_search = SearchIndex(
+                ("full_name", "position", "current_task"))
+            cls._instance.load_errors = []
+            cls._instance.codec = create_codec()
+            cls._instance.storage = create_storage(codec=cls._instance.codec)
+            cls._instance.history = cls._instance.storage.history
+            cls._instance.storage_lock = threading.Lock()
+            cls._instance.save_scheduler = None
+            cls._instance.listeners = []
+            cls._instance.loaded = False
+            if not defer_load:
+                cls._instance.load_all_data()
         return cls._instance
 
+    @timed
     def load_all_data(self):
         try:
-            if os.path.exists("data/staff_data.json"):
-                with open("data/staff_data.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.employees = data.get("employees", [])
+            data = self.read_data()
+
+        except Exception as e:
+            print(f"Ошибка загрузки данных: {e}")
+            return
 
-            if os.path.exists("data/tasks_data.json"):
-                with open("data/tasks_data.json", "r", encoding="utf-8") as f:
-                    self.tasks = json.load(f)
+        self.apply_data(data)
 
-            if os.path.exists("data/calendar_events.json"):
-                with open("data/calendar_events.json", "r", encoding="utf-8") as f:
-                    self.events = json.load(f)
+    @timed
+    def read_data(self):
+        # Только чтение хранилища: можно вызывать из фонового потока
+        with self.storage_lock:
+            return self.storage.load()
 
-            if os.path.exists("data/documents_data.json"):
-                with open("data/documents_data.json", "r", encoding="utf-8") as f:
-                    self.documents = json.load(f)
+    @timed
+    def apply_data(self, data):
+        try:
+            history_moved = self._apply_loaded(data)
+            self.dirty.clear()
+            # Изменения, восстановленные из журнала, ещё не попали в снимок
+            self.mark_dirty(*self.storage.recovered)
+            if history_moved:
+                # staff_data.json перезапишется уже без истории задач
+                self.mark_dirty("employees")
+            self.load_errors = list(self.storage.load_errors)
+            for error in self.load_errors:
+                print(f"Ошибка загрузки данных: {error}")
+            self.loaded = True
 
         except Exception as e:
             print(f"Ошибка загрузки данных: {e}")
 
-    def save_all_data(self):
-        try:
-            os.makedirs("data", exist_ok=True)
+    def _apply_loaded(self, data):
+        # Списки обновляются на месте: страницы держат ссылки на них
+        with paused_gc():
+            for collection in COLLECTION_FILES:
+                payload = from_collection(
+                    collection,
+                    data.get(collection, empty_collection(collection)))
+                current = getattr(self, collection)
+                current.clear()
+                if collection == "events":
+                    current.update(payload)
+                else:
+                    current.extend(payload)
+            history_moved = move_embedded_history(self.employees, self.history)
+            self.rebuild_indexes()
+        return history_moved
+
+    def rebuild_indexes(self):
+        for index in (
+            self.employees_by_id,
+            self.employees_by_name,
+            self.tasks_by_id,
+            self.tasks_by_assignee,
+            self.tasks_by_status,
+            self.tasks_by_priority,
+            self.events_by_assignee,
+            self.documents_by_name,
+            self.documents_by_hash,
+            self.documents_by_path,
+        ):
+            index.clear()
+        self.employee_search.clear()
+        self.event_timeline.clear()
+        self.aggregates.clear()
+
+        for employee in self.employees:
+            self._index_employee(employee)
+        for task in self.tasks:
+            self._index_task(task)
+        for date, date_events in self.events.items():
+            for event in date_events:
+                self._index_event(date, event)
+        for doc in self.documents:
+            self._index_document(doc)
+        for collection in COLLECTION_FILES:
+            self._notify(collection, "reset")
+
+    def _index_employee(self, employee):
+        self.employees_by_id[employee.id] = employee
+        self.employees_by_name.setdefault(
+            employee.full_name, {})[employee.id] = employee
+        self.employee_search.add(employee)
+        self.aggregates.count_employee(employee, 1)
+
+    def _unindex_employee(self, employee):
+        self.employees_by_id.pop(employee.id, None)
+        _discard(self.employees_by_name, employee.full_name, employee.id)
+        self.employee_search.remove(employee)
+        self.aggregates.count_employee(employee, -1)
+
+    def _index_task(self, task):
+        task_id = task.id
+        self.tasks_by_id[task_id] = task
+        self.tasks_by_assignee.setdefault(
+            task.get("assignee_id"), {})[task_id] = task
+        self.tasks_by_status.setdefault(task.status, {})[task_id] = task
+        self.tasks_by_priority.setdefault(task.priority, {})[task_id] = task
+        self.aggregates.count_task(task, 1)
+
+    def _unindex_task(self, task):
+        self.tasks_by_id.pop(task.id, None)
+        _discard(self.tasks_by_assignee, task.get("assignee_id"), task.id)
+        _discard(self.tasks_by_status, task.status, task.id)
+        _discard(self.tasks_by_priority, task.priority, task.id)
+        self.aggregates.count_task(task, -1)
+
+    def _index_event(self, date, event):
+        self.events_by_assignee.setdefault(
+            event.get("assignee_id"), {})[id(event)] = event
+        self.event_timeline.add(date, event)
+        self.aggregates.count_event(event, 1)
+
+    def _unindex_event(self, event):
+        _discard(self.events_by_assignee, event.get("assignee_id"), id(event))
+        self.event_timeline.remove(event)
+        self.aggregates.count_event(event, -1)
+
+    def _index_document(self, doc):
+        self.documents_by_name[doc.name] = doc
+        if doc.sha256:
+            self.documents_by_hash.setdefault(doc.sha256, {})[doc.name] = doc
+        self.documents_by_path.setdefault(doc.path, {})[doc.name] = doc
+        self.aggregates.count_document(doc, 1)
+
+    def _unindex_document(self, doc):
+        self.documents_by_name.pop(doc.name, None)
+        _discard(self.documents_by_hash, doc.get("sha256"), doc.name)
+        _discard(self.documents_by_path, doc.path, doc.name)
+        self.aggregates.count_document(doc, -1)
 
-            with open("data/staff_data.json", "w", encoding="utf-8") as f:
-                json.dump({"employees": self.employees},
-                          f, ensure_ascii=False, indent=2)
+    def subscribe(self, callback):
+        # callback(collection, change, key, item); change - "add", "update",
+        # "remove" или "reset" после полной перезагрузки коллекции
+        self.listeners.append(callback)
 
-            with open("data/tasks_data.json", "w", encoding="utf-8") as f:
-                json.dump(self.tasks, f, ensure_ascii=False, indent=2)
+    def unsubscribe(self, callback):
+        self.listeners.remove(callback)
 
-            with open("data/calendar_events.json", "w", encoding="utf-8") as f:
-                json.dump(self.events, f, ensure_ascii=False, indent=2)
+    def _notify(self, collection, change, key=None, item=None):
+        for callback in list(self.listeners):
+            callback(collection, change, key, item)
 
-            with open("data/documents_data.json", "w", encoding="utf-8") as f:
-                json.dump(self.documents, f, ensure_ascii=False, indent=2)
+    def mark_dirty(self, *collections, key=None):
+        for collection in collections:
+            if collection not in COLLECTION_FILES:
+                raise KeyError(f"Неизвестная коллекция: {collection}")
+            if key is None:
+                self.dirty[collection] = None
+            elif collection not in self.dirty:
+                # dict, а не set: строки пишутся в хранилище в порядке
+                # изменений, и порядок записей не зависит от хешей ключей
+                self.dirty[collection] = {key: None}
+            elif self.dirty[collection] is not None:
+                self.dirty[collection][key] = None
+
+    def has_unsaved_changes(self):
+        return bool(self.dirty)
+
+    def _find_row(self, collection, key):
+        if collection == "employees":
+            return self.get_employee_by_id(key)
+        if collection == "tasks":
+            return self.get_task_by_id(key)
+        if collection == "events":
+            return self.events.get(key)
+        return self.get_document_by_name(key)
+
+    def take_snapshot(self):
+        # Копии изменённых данных, которые можно сериализовать в другом потоке
+        collections = {}
+        for collection, keys in self.dirty.items():
+            if keys is None or not self.storage.row_level:
+                payload = _copy_collection(
+                    collection, getattr(self, collection))
+                collections[collection] = (payload, None)
+            else:
+                collections[collection] = (None, {
+                    key: _copy_row(collection, self._find_row(collection, key))
+                    for key in keys
+                })
+        self.dirty.clear()
+        return {
+            "collections": collections,
+            "journal": self.storage.seal_journal(),
+        }
+
+    @timed
+    def write_snapshot(self, snapshot):
+        with self.storage_lock:
+            collections = snapshot["collections"]
+            for collection in sorted(collections):
+                payload, changes = collections[collection]
+                self.storage.save(collection, payload, changes)
+            self.storage.finish_compaction(snapshot["journal"])
+
+    def restore_dirty(self, snapshot):
+        for collection, (payload, changes) in snapshot["collections"].items():
+            if changes is None:
+                self.mark_dirty(collection)
+            else:
+                for key in changes:
+                    self.mark_dirty(collection, key=key)
+
+    @timed
+    def save_all_data(self):
+        if not self.dirty:
+            return False
+
+        snapshot = self.take_snapshot()
+        try:
+            self.write_snapshot(snapshot)
 
         except Exception as e:
+            self.restore_dirty(snapshot)
             print(f"Ошибка сохранения данных: {e}")
 
+        return not self.dirty
+
+    def needs_compaction(self):
+        if not self.dirty:
+            return False
+        if not self.storage.journal:
+            return True
+        # Построчные изменения уже записаны в журнал; снимок нужен только
+        # для изменений целых коллекций или когда журнал разросся
+        return (None in self.dirty.values()
+                or self.storage.journal_records >= JOURNAL_COMPACT_RECORDS)
+
+    def close(self):
+        self.storage.close()
+
+    def request_save(self, compact=False):
+        # Явное сохранение сворачивает журнал, даже если он еще не разросся
+        if not self.needs_compaction() and not (compact and self.dirty):
+            return
+        if self.save_scheduler is not None:
+            self.save_scheduler()
+        else:
+            self.save_all_data()
+
+    def export_json(self, folder):
+        # Экспорт самодостаточен: история задач снова внутри сотрудников
+        target = JsonStorage(folder, codec=self.codec)
+        histories = self.history.items()
+        for collection in COLLECTION_FILES:
+            payload = getattr(self, collection)
+            if collection == "employees":
+                payload = [
+                    dict(to_plain(employee),
+                         task_history=histories.get(str(employee.id), []))
+                    for employee in payload
+                ]
+            target.save(collection, payload)
+
+    def import_json(self, folder):
+        data = JsonStorage(folder, codec=self.codec).load()
+        self.history.clear_all()
+        self._apply_loaded(data)
+        self.mark_dirty(*COLLECTION_FILES)
+
+    def _journal(self, op, collection, key, value=None, **extra):
+        record = {"op": op, "c": collection, "key": key}
+        if value is not None:
+            record["value"] = to_plain(value)
+        record.update(extra)
+        self.storage.log(record)
+        self.mark_dirty(collection, key=key)
+
+    def add_employee(self, employee):
+        employee = Employee.from_dict(employee)
+        move_embedded_history([employee], self.history)
+        self.employees.append(employee)
+        self._index_employee(employee)
+        self._journal("put", "employees", employee["id"], employee)
+        self._notify("employees", "add", employee["id"], employee)
+        return employee
+
+    def update_employee(self, employee, changes):
+        self._unindex_employee(employee)
+        employee.update(changes)
+        self._index_employee(employee)
+        self._journal("update", "employees", employee["id"], changes)
+        self._notify("employees", "update", employee["id"], employee)
+
+    def remove_employee(self, employee):
+        self.employees.pop(_position(self.employees, employee))
+        self._unindex_employee(employee)
+        # Сначала журнал: после сбоя запуск повторит очистку истории
+        self._journal("delete", "employees", employee["id"])
+        self.history.clear(employee["id"])
+        self._notify("employees", "remove", employee["id"], employee)
+
+    def change_employee_task(self, employee, new_task, timestamp):
+        old_task = employee["current_task"]
+        if old_task and old_task != new_task:
+            # Одна запись в конец сегмента истории, без перезаписи сотрудников.
+            # Как и остальные изменения, она сначала попадает в журнал
+            entry = {
+                "task": old_task,
+                "start_date": timestamp,
+                "end_date": timestamp,
+                "type": "смена",
+            }
+            self._journal("history_add", "employees", employee["id"], entry,
+                          seq=self.history.count(employee["id"]))
+            self.history.append(employee["id"], entry)
+        self.employee_search.remove(employee)
+        employee["current_task"] = new_task
+        self.employee_search.add(employee)
+        self._journal("update", "employees", employee["id"],
+                      {"current_task": new_task})
+        self._notify("employees", "update", employee["id"], employee)
+
+    def add_task(self, task):
+        task = Task.from_dict(task)
+        self.tasks.append(task)
+        self._index_task(task)
+        self._journal("put", "tasks", task["id"], task)
+        self._notify("tasks", "add", task["id"], task)
+        return task
+
+    def update_task(self, task, changes):
+        self._unindex_task(task)
+        task.update(changes)
+        self._index_task(task)
+        self._journal("update", "tasks", task["id"], changes)
+        self._notify("tasks", "update", task["id"], task)
+
+    def add_event(self, date, event):
+        event = CalendarEvent.from_dict(event)
+        self.events.setdefault(date, []).append(event)
+        self._index_event(date, event)
+        self._journal("put", "events", date, self.events[date])
+        self._notify("events", "add", date, event)
+        return event
+
+    def update_event(self, date, event, changes):
+        self._unindex_event(event)
+        event.update(changes)
+        self._index_event(date, event)
+        self._journal("put", "events", date, self.events[date])
+        self._notify("events", "update", date, event)
+
+    def remove_event(self, date, event):
+        date_events = self.events[date]
+        date_events.pop(_position(date_events, event))
+        self._unindex_event(event)
+        self._journal("put", "events", date, date_events)
+        self._notify("events", "remove", date, event)
+
+    def put_document(self, doc):
+        doc = Document.from_dict(doc)
+        change = self._store_document(doc)
+        self._journal("put", "documents", doc["name"], doc)
+        self._notify("documents", change, doc["name"], doc)
+        return doc
+
+    def put_documents(self, docs):
+        docs = [Document.from_dict(doc) for doc in docs]
+        changes = [self._store_document(doc) for doc in docs]
+        self._mark_documents_dirty(docs)
+        for doc, change in zip(docs, changes):
+            self._notify("documents", change, doc["name"], doc)
+        return docs
+
+    def update_documents(self, updates):
+        for doc, changes in updates:
+            self._unindex_document(doc)
+            doc.update(changes)
+            self._index_document(doc)
+        self._mark_documents_dirty([doc for doc, changes in updates])
+        for doc, changes in updates:
+            self._notify("documents", "update", doc["name"], doc)
+
+    def _mark_documents_dirty(self, docs):
+        # Пакет сохраняется одной записью, а не строкой журнала на файл
+        if self.storage.row_level:
+            for doc in docs:
+                self.mark_dirty("documents", key=doc["name"])
+        elif docs:
+            self.mark_dirty("documents")
+
+    def _store_document(self, doc):
+        existing = self.documents_by_name.get(doc["name"])
+        if existing is not None:
+            self.documents[_position(self.documents, existing)] = doc
+            self._unindex_document(existing)
+        else:
+            self.documents.append(doc)
+        self._index_document(doc)
+        return "add" if existing is None else "update"
+
+    def update_document(self, doc, changes):
+        self._unindex_document(doc)
+        doc.update(changes)
+        self._index_document(doc)
+        self._journal("update", "documents", doc["name"], changes)
+        self._notify("documents", "update", doc["name"], doc)
+
+    def remove_document(self, doc):
+        self.documents.pop(_position(self.documents, doc))
+        self._unindex_document(doc)
+        self._journal("delete", "documents", doc["name"])
+        self._notify("documents", "remove", doc["name"], doc)
+
+    @timed
+    def query_history(self, employee, date_from=None, date_to=None,
+                      sort_field="start_date", descending=False):
+        # Ключи строк истории в нужном порядке; сами записи - fetch_history
+        return self.history.query(
+            employee["id"], date_from, date_to, sort_field, descending)
+
+    @timed
+    def fetch_history(self, employee, keys):
+        return [
+            TaskHistoryEntry.from_dict(entry)
+            for entry in self.history.fetch(employee["id"], keys)
+        ]
+
+    def history_period_counts(self, employee, date_from=None, date_to=None,
+                              period="month"):
+        return self.history.period_counts(
+            employee["id"], date_from, date_to, period)
+
     def get_employee_by_id(self, emp_id):
-        return next(
-            (emp for emp in self.employees if emp["id"] == emp_id),
-            None)
+        return self.employees_by_id.get(emp_id)
+
+    def get_employee_by_name(self, full_name):
+        return next(iter(self.employees_by_name.get(full_name, {}).values()),
+                    None)
+
+    def get_task_by_id(self, task_id):
+        return self.tasks_by_id.get(task_id)
 
     def get_tasks_by_assignee(self, assignee_id):
-        return [task for task in self.tasks if task.get(
-            "assignee_id") == assignee_id]
+        return list(self.tasks_by_assignee.get(assignee_id, {}).values())
+
+    def get_tasks_by_status(self, status):
+        return list(self.tasks_by_status.get(status, {}).values())
+
+    def get_tasks_by_priority(self, priority):
+        return list(self.tasks_by_priority.get(priority, {}).values())
 
     def get_events_by_assignee(self, assignee_id):
-        all_events = []
-        for date_events in self.events.values():
-            for event in date_events:
-                if event.get("assignee_id") == assignee_id:
-                    all_events.append(event)
-        return all_events
\ No newline at end of file
+        return list(self.events_by_assignee.get(assignee_id, {}).values())
+
+    def events_between(self, start, end):
+        return self.event_timeline.events_between(start, end)
+
+    def events_in_month(self, year, month):
+        return self.event_timeline.events_in_month(year, month)
+
+    def events_from(self, start):
+        return self.event_timeline.events_from(start)
+
+    def next_n_events(self, now, n):
+        return self.event_timeline.next_n_events(now, n)
+
+    def search_employees(self, query):
+        return self.employee_search.search(query)
+
+    def employee_matches(self, employee, query):
+        return self.employee_search.matches(employee["id"], query)
+
+    def get_document_by_name(self, name):
+        return self.documents_by_name.get(name)
+
+    def document_references(self, digest):
+        return len(self.documents_by_hash.get(digest, {}))
+
+    def get_documents_by_path(self, path):
+        return list(self.documents_by_path.get(path, {}).values())
+
+
+def _copy_row(collection, row):
+    if row is None:
+        return None
+    return to_plain(row)
+
+
+def _copy_collection(collection, payload):
+    if collection == "events":
+        return {date: _copy_row(collection, date_events)
+                for date, date_events in payload.items()}
+    return [_copy_row(collection, row) for row in payload]
+
+
+def _position(rows, row):
+    return next(i for i, other in enumerate(rows) if other is row)
+
+
+def _discard(index, value, key):
+    bucket = index.get(value)
+    if bucket is not None:
+        bucket.pop(key, None)
+        if not bucket:
+            del index[value]
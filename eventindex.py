@@ -0,0 +1,70 @@
+import bisect
+import itertools
+
+from datetime import datetime
+
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+class EventTimeline:
+
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+        self.serials = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys.clear()
+        self.entries.clear()
+        self.serials.clear()
+
+    def add(self, date, event):
+        key = (event_datetime(date, event), next(self.counter))
+        position = bisect.bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.entries.insert(position, (date, event))
+        self.serials[id(event)] = key
+
+    def remove(self, event):
+        key = self.serials.pop(id(event), None)
+        if key is None:
+            return
+        position = bisect.bisect_left(self.keys, key)
+        del self.keys[position]
+        del self.entries[position]
+
+    def events_between(self, start, end):
+        # Границы включительно; принимаются datetime или строки "ГГГГ-ММ-ДД ЧЧ:ММ"
+        lo = bisect.bisect_left(self.keys, (as_key(start),))
+        hi = bisect.bisect_right(self.keys, (as_key(end), float("inf")))
+        return self.entries[lo:hi]
+
+    def events_in_month(self, year, month):
+        prefix = f"{year:04d}-{month:02d}"
+        return self.events_between(f"{prefix}-01 00:00", f"{prefix}-31 23:59")
+
+    def events_from(self, start):
+        lo = bisect.bisect_left(self.keys, (as_key(start),))
+        return self.entries[lo:]
+
+    def next_n_events(self, now, n):
+        lo = bisect.bisect_left(self.keys, (as_key(now),))
+        return self.entries[lo:lo + n]
+
+
+def as_key(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value
+
+
+def event_datetime(date, event):
+    value = event.get("datetime")
+    if value and value.startswith(date):
+        return value
+    return f"{date} {event.get('time', '')}".rstrip()
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+
+from storage import DATA_DIR
+
+
+FULLTEXT_FILE = "documents_fts.db"
+TEXT_TYPES = (".txt", ".log", ".csv", ".json", ".xml", ".html")
+INDEX_LIMIT = 16 * 1024 * 1024
+
+
+class DocumentIndex:
+
+    SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            name UNINDEXED,
+            content,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+
+        CREATE TABLE IF NOT EXISTS indexed (
+            name        TEXT PRIMARY KEY,
+            stamp       TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path=os.path.join(DATA_DIR, FULLTEXT_FILE)):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+
+    def sync(self, documents):
+        # Переиндексируются только новые и изменившиеся документы. Синхронизации
+        # идут по очереди, иначе более старая может перезаписать новую
+        try:
+            with self.sync_lock:
+                with self.lock:
+                    stamps = dict(
+                        self.conn.execute("SELECT name, stamp FROM indexed"))
+                current = set()
+                for doc in documents:
+                    if doc.get("type") not in TEXT_TYPES:
+                        continue
+                    current.add(doc["name"])
+                    if stamps.get(doc["name"]) != document_stamp(doc):
+                        try:
+                            self.add(doc)
+                        except OSError as e:
+                            print(f"Ошибка индексации документов: {e}")
+                for name in stamps.keys() - current:
+                    self.remove(name)
+
+        except sqlite3.Error as e:
+            print(f"Ошибка индексации документов: {e}")
+
+    def add(self, doc):
+        # Недоступный файл тоже получает отметку: до изменения документа
+        # он больше не открывается, а ошибка передается вызывающему
+        error = None
+        try:
+            with open(doc["path"], "r", encoding="utf-8", errors="replace") as f:
+                content = f.read(INDEX_LIMIT)
+        except OSError as e:
+            content = None
+            error = e
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM documents_fts WHERE name = ?", (doc["name"],))
+            if content is not None:
+                self.conn.execute(
+                    "INSERT INTO documents_fts (name, content) VALUES (?, ?)",
+                    (doc["name"], content))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO indexed (name, stamp) VALUES (?, ?)",
+                (doc["name"], document_stamp(doc)))
+        if error is not None:
+            raise error
+
+    def remove(self, name):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM documents_fts WHERE name = ?", (name,))
+            self.conn.execute("DELETE FROM indexed WHERE name = ?", (name,))
+
+    def search(self, query, limit=200):
+        match = match_expression(query)
+        if not match:
+            return []
+        with self.lock:
+            return self.conn.execute(
+                """
+                SELECT name, snippet(documents_fts, 1, '«', '»', '…', 12)
+                FROM documents_fts
+                WHERE documents_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def document_stamp(doc):
+    return doc.get("sha256") or f"{doc.get('size')}|{doc.get('modified')}"
+
+
+def match_expression(query):
+    # Слова ищутся как фразы, последнее - по префиксу, пока его дописывают
+    words = [word.replace('"', "") for word in query.split()]
+    words = [word for word in words if word]
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
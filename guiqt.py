@@ -2,9 +2,11 @@ import sys
 import os
 import hashlib
 import json
-import shutil
+import threading
+import time
 
-from datetime        import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime        import datetime
 from PyQt5.QtWidgets import (
     QMainWindow,
     QVBoxLayout,
@@ -16,6 +18,8 @@ from PyQt5.QtWidgets import (
     QAction,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QHeaderView,
     QLineEdit,
     QComboBox,
@@ -25,20 +29,45 @@ from PyQt5.QtWidgets import (
     QTextEdit,
     QListWidget,
     QListWidgetItem,
+    QListView,
+    QStyledItemDelegate,
     QCalendarWidget,
     QDialog,
     QDialogButtonBox,
     QFormLayout,
     QTimeEdit,
+    QDateEdit,
     QSplitter,
     QToolBar,
     QStatusBar,
     QGroupBox,
     QMenu,
+    QInputDialog,
+    QCheckBox,
+    QProgressDialog,
 )
-from PyQt5.QtCore import Qt, QSize, QTimer, QTime, QDate
-from PyQt5.QtGui  import QPalette, QColor
+from PyQt5.QtCore import (
+    Qt,
+    QSize,
+    QTimer,
+    QTime,
+    QDate,
+    QObject,
+    pyqtSignal,
+    QAbstractTableModel,
+    QAbstractListModel,
+    QModelIndex,
+    QFileSystemWatcher,
+)
+from PyQt5.QtGui  import QPalette, QColor, QTextCursor
+from blobstore    import BlobStore
 from datamanager  import DataManager
+from fulltext     import TEXT_TYPES, DocumentIndex
+from instrumentation import profiler, timed
+from pagedfile    import PREVIEW_LIMIT, PagedFile
+from records      import to_plain
+from reminders    import ReminderQueue
+from stallwatch   import create_watchdog
 
 
 class DarkTheme:
@@ -67,6 +96,230 @@ class DarkTheme:
         app.setPalette(palette)
 
 
+class PersistenceWorker(QObject):
+
+    save_started = pyqtSignal()
+    save_finished = pyqtSignal(bool, str)
+    load_finished = pyqtSignal(str)
+
+    def __init__(self, data_manager, delay=500):
+        super().__init__()
+        self.data_manager = data_manager
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="persistence")
+        self.future = None
+        self.snapshot = None
+        self.pending = False
+
+        # Серия запросов за время задержки превращается в одну запись
+        self.delay_timer = QTimer(self)
+        self.delay_timer.setSingleShot(True)
+        self.delay_timer.setInterval(delay)
+        self.delay_timer.timeout.connect(self.start_write)
+
+        self.save_finished.connect(self.on_write_finished)
+
+    def request_save(self, immediate=False):
+        if not self.data_manager.has_unsaved_changes():
+            return
+        if immediate:
+            self.delay_timer.stop()
+            self.start_write()
+        else:
+            self.delay_timer.start()
+
+    @timed
+    def start_write(self):
+        if self.future is not None:
+            self.pending = True
+            return
+        if not self.data_manager.has_unsaved_changes():
+            return
+
+        self.snapshot = self.data_manager.take_snapshot()
+        self.save_started.emit()
+        self.future = self.executor.submit(self.write, self.snapshot)
+
+    def write(self, snapshot):
+        try:
+            self.data_manager.write_snapshot(snapshot)
+        except Exception as e:
+            self.save_finished.emit(False, str(e))
+        else:
+            self.save_finished.emit(True, "")
+
+    def on_write_finished(self, ok, error):
+        if not ok and self.snapshot is not None:
+            self.data_manager.restore_dirty(self.snapshot)
+            print(f"Ошибка сохранения данных: {error}")
+        self.future = None
+        self.snapshot = None
+
+        if self.pending:
+            self.pending = False
+            self.start_write()
+
+    def load(self, mark_stage):
+        self.executor.submit(self.read, mark_stage)
+
+    def read(self, mark_stage):
+        # Страницы еще не созданы, поэтому данные можно разобрать
+        # и проиндексировать целиком в этом потоке
+        try:
+            data = self.data_manager.read_data()
+            mark_stage("чтение данных")
+            self.data_manager.apply_data(data)
+            mark_stage("индексы")
+        except Exception as e:
+            self.load_finished.emit(str(e))
+        else:
+            self.load_finished.emit("")
+
+    def wait(self):
+        self.delay_timer.stop()
+        self.pending = False
+        if self.future is not None:
+            self.future.result()
+
+    def shutdown(self):
+        self.wait()
+        self.executor.shutdown(wait=True)
+
+
+class DocumentImporter(QObject):
+
+    file_done = pyqtSignal(object, str)
+
+    def __init__(self, blobs, workers=4):
+        super().__init__()
+        self.blobs = blobs
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="import")
+        self.cancelled = threading.Event()
+
+    def start(self, jobs):
+        self.cancelled.clear()
+        for name, file_path in jobs:
+            self.executor.submit(self.copy, name, file_path)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def copy(self, name, file_path):
+        # Каждое задание отвечает ровно одним сигналом, даже после отмены
+        if self.cancelled.is_set():
+            self.file_done.emit(None, "")
+            return
+        try:
+            digest, blob_path = self.blobs.put(file_path)
+            doc_data = {
+                "name": name,
+                "path": blob_path,
+                "sha256": digest,
+                "size": os.path.getsize(blob_path),
+                "modified": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                "type": os.path.splitext(name)[1].lower(),
+            }
+        except Exception as e:
+            self.file_done.emit(None, f"{name}: {e}")
+        else:
+            self.file_done.emit(doc_data, "")
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=True)
+
+
+class DocumentWatcher(QObject):
+
+    files_changed = pyqtSignal(object)
+
+    def __init__(self, delay=500, poll_interval=5000):
+        super().__init__()
+        self.paths = set()
+        self.changed = set()
+        # Файлы, которые QFileSystemWatcher отследить не смог, опрашиваются
+        self.polled = {}
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setSingleShot(True)
+        self.batch_timer.setInterval(delay)
+        self.batch_timer.timeout.connect(self.flush)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(poll_interval)
+        self.poll_timer.timeout.connect(self.poll)
+
+    def set_paths(self, paths):
+        paths = set(paths)
+        removed = self.paths - paths
+        added = paths - self.paths
+        self.paths = paths
+
+        if removed:
+            watched = set(self.watcher.files())
+            stale = [path for path in removed if path in watched]
+            if stale:
+                self.watcher.removePaths(stale)
+            for path in removed:
+                self.polled.pop(path, None)
+        if added:
+            self.watch(added)
+
+    def watch(self, paths):
+        existing = [path for path in paths if os.path.exists(path)]
+        failed = set(self.watcher.addPaths(existing)) if existing else set()
+        for path in failed.union(paths).difference(existing):
+            self.polled[path] = file_signature(path)
+        if self.polled and not self.poll_timer.isActive():
+            self.poll_timer.start()
+
+    def on_file_changed(self, path):
+        self.changed.add(path)
+        self.batch_timer.start()
+
+    def poll(self):
+        for path, signature in list(self.polled.items()):
+            current = file_signature(path)
+            if current != signature:
+                self.polled[path] = current
+                self.on_file_changed(path)
+        if not self.polled:
+            self.poll_timer.stop()
+
+    def flush(self):
+        changed = self.changed & self.paths
+        self.changed = set()
+
+        # Редакторы часто сохраняют файл заменой, и наблюдение за ним теряется
+        watched = set(self.watcher.files())
+        lost = [path for path in changed
+                if path not in watched and path not in self.polled]
+        if lost:
+            self.watch(lost)
+        for path in changed.intersection(self.polled):
+            if os.path.exists(path) and not self.watcher.addPaths([path]):
+                del self.polled[path]
+
+        if changed:
+            self.files_changed.emit(changed)
+
+    def shutdown(self):
+        self.batch_timer.stop()
+        self.poll_timer.stop()
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
 class CollapsibleSidebar(QFrame):
 
     def __init__(self, parent=None):
@@ -117,13 +370,159 @@ class CollapsibleSidebar(QFrame):
         self.layout.addStretch()
 
 
+def sorted_position(rows, target, position_of):
+    # bisect по позиции в исходном списке: key у bisect есть только с 3.10
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if position_of(rows[mid]) < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class EmployeeTableModel(QAbstractTableModel):
+
+    COLUMNS = [
+        ("Личный ID", "id"),
+        ("ФИО", "full_name"),
+        ("Дата рождения", "birth_date"),
+        ("Должность", "position"),
+        ("Текущая задача", "current_task"),
+        ("Статус", "status"),
+    ]
+
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.employees = list(data_manager.employees)
+        self.visible = None
+        self.rows = None
+        self.source_rows = None
+
+    def shown(self):
+        return self.employees if self.visible is None else self.visible
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.shown())
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        employee = self.shown()[index.row()]
+        field = self.COLUMNS[index.column()][1]
+        if field == "status":
+            return employee.get("status", "Активен")
+        return employee.get(field, "")
+
+    def employee_at(self, row):
+        return self.shown()[row]
+
+    def row_of(self, employee):
+        if self.rows is None:
+            self.rows = {emp.id: row for row, emp in enumerate(self.shown())}
+        return self.rows.get(employee.id, -1)
+
+    def source_row(self, emp_id):
+        if self.source_rows is None:
+            self.source_rows = {
+                emp.id: row for row, emp in enumerate(self.employees)}
+        return self.source_rows[emp_id]
+
+    def set_filter(self, ids):
+        self.beginResetModel()
+        if ids is None:
+            self.visible = None
+        elif len(ids) * 8 > len(self.employees):
+            self.visible = [emp for emp in self.employees if emp.id in ids]
+        else:
+            self.visible = [
+                self.employees[row]
+                for row in sorted(self.source_row(emp_id) for emp_id in ids)
+            ]
+        self.rows = None
+        self.endResetModel()
+
+    # Модель держит свою копию списка, поэтому строки вставляются и
+    # удаляются между begin*/end*, как того требует Qt
+    def employee_added(self, employee):
+        row = len(self.employees)
+        if self.visible is not None:
+            self.employees.append(employee)
+            if self.source_rows is not None:
+                self.source_rows[employee["id"]] = row
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.employees.append(employee)
+        if self.rows is not None:
+            self.rows[employee["id"]] = row
+        if self.source_rows is not None:
+            self.source_rows[employee["id"]] = row
+        self.endInsertRows()
+
+    def employee_removed(self, employee):
+        row = self.row_of(employee)
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        self.employees.pop(self.source_row(employee["id"]))
+        if self.visible is not None and row >= 0:
+            self.visible.pop(row)
+        self.rows = None
+        self.source_rows = None
+        if row >= 0:
+            self.endRemoveRows()
+
+    def employee_changed(self, employee):
+        row = self.row_of(employee)
+        if row >= 0:
+            self.dataChanged.emit(
+                self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def set_visible(self, employee, visible):
+        # При активном фильтре измененная запись входит в выборку или
+        # выходит из нее одной строкой, без сброса выделения и прокрутки
+        if self.visible is None:
+            return
+        row = self.row_of(employee)
+        if visible and row < 0:
+            row = sorted_position(
+                self.visible, self.source_row(employee["id"]),
+                lambda emp: self.source_row(emp.id))
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.visible.insert(row, employee)
+            self.rows = None
+            self.endInsertRows()
+        elif not visible and row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.visible.pop(row)
+            self.rows = None
+            self.endRemoveRows()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.employees = list(self.data_manager.employees)
+        self.visible = None
+        self.rows = None
+        self.source_rows = None
+        self.endResetModel()
+
+
 class StaffPage(QWidget):
 
     def __init__(self, data_manager):
         super().__init__()
         self.data_manager = data_manager
-        self.employees = data_manager.employees
         self.init_ui()
+        self.data_manager.subscribe(self.on_data_changed)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -155,27 +554,23 @@ class StaffPage(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText(
             "Введите ФИО, должность или задачу...")
-        self.search_input.textChanged.connect(self.filter_table)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.filter_table)
+        self.search_input.textChanged.connect(self.search_timer.start)
         search_layout.addWidget(self.search_input)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(
-            [
-                "Личный ID",
-                "ФИО",
-                "Дата рождения",
-                "Должность",
-                "Текущая задача",
-                "Статус",
-                "ID",
-            ]
-        )
-        self.table.hideColumn(6)
+        self.model = EmployeeTableModel(self.data_manager, self)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(1, QHeaderView.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
 
         self.btn_add.clicked.connect(self.add_employee)
         self.btn_delete.clicked.connect(self.delete_employee)
@@ -192,7 +587,6 @@ class StaffPage(QWidget):
         layout.addWidget(self.table)
 
         self.setLayout(layout)
-        self.update_table()
 
     def generate_id(self, full_name, birth_date, position):
         data = f"{full_name}{birth_date}{position}{datetime.now()}"
@@ -210,117 +604,94 @@ class StaffPage(QWidget):
                 "birth_date": birth_date,
                 "position": position,
                 "current_task": current_task,
-                "task_history": [],
                 "status": "Активен",
             }
 
-            self.employees.append(employee_data)
-            self.update_table()
+            self.data_manager.add_employee(employee_data)
 
-    def delete_employee(self):
-        current_row = self.table.currentRow()
-        if current_row >= 0:
-            emp_id = self.table.item(current_row, 6).text()
-            employee = self.data_manager.get_employee_by_id(emp_id)
+    def current_employee(self):
+        index = self.table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.model.employee_at(index.row())
 
-            if employee:
-                reply = QMessageBox.question(
-                    self,
-                    "Подтверждение",
-                    f'Вы уверены, что хотите удалить сотрудника {employee["full_name"]}?',
-                    QMessageBox.Yes | QMessageBox.No,
-                )
-                if reply == QMessageBox.Yes:
-                    self.employees.remove(employee)
-                    self.update_table()
+    def delete_employee(self):
+        employee = self.current_employee()
+        if employee:
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                f'Вы уверены, что хотите удалить сотрудника {employee["full_name"]}?',
+                QMessageBox.Yes | QMessageBox.No,
+            )
+            if reply == QMessageBox.Yes:
+                self.data_manager.remove_employee(employee)
 
     def edit_employee(self):
-        current_row = self.table.currentRow()
-        if current_row >= 0:
-            emp_id = self.table.item(current_row, 6).text()
-            employee = self.data_manager.get_employee_by_id(emp_id)
-
-            if employee:
-                dialog = EmployeeDialog(
-                    self, self.data_manager.employees, employee)
-                if dialog.exec_():
-                    full_name, birth_date, position, current_task = dialog.get_data()
-                    employee.update(
-                        {
-                            "full_name": full_name,
-                            "birth_date": birth_date,
-                            "position": position,
-                            "current_task": current_task,
-                        }
-                    )
-                    self.update_table()
+        employee = self.current_employee()
+        if employee:
+            dialog = EmployeeDialog(
+                self, self.data_manager.employees, employee)
+            if dialog.exec_():
+                full_name, birth_date, position, current_task = dialog.get_data()
+                self.data_manager.update_employee(
+                    employee,
+                    {
+                        "full_name": full_name,
+                        "birth_date": birth_date,
+                        "position": position,
+                        "current_task": current_task,
+                    }
+                )
 
     def change_task(self):
-        current_row = self.table.currentRow()
-        if current_row >= 0:
-            emp_id = self.table.item(current_row, 6).text()
-            employee = self.data_manager.get_employee_by_id(emp_id)
-
-            if employee:
-                old_task = employee["current_task"]
-                new_task, ok = QInputDialog.getText(
-                    self, "Смена задачи", "Введите новую задачу:", text=old_task)
-                if ok and new_task:
-                    if old_task and old_task != new_task:
-                        employee["task_history"].append(
-                            {
-                                "task": old_task,
-                                "start_date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                                "end_date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                                "type": "смена",
-                            }
-                        )
-
-                    employee["current_task"] = new_task
-                    self.update_table()
+        employee = self.current_employee()
+        if employee:
+            old_task = employee["current_task"]
+            new_task, ok = QInputDialog.getText(
+                self, "Смена задачи", "Введите новую задачу:", text=old_task)
+            if ok and new_task:
+                self.data_manager.change_employee_task(
+                    employee, new_task,
+                    datetime.now().strftime("%Y-%m-%d %H:%M"))
 
     def view_task_history(self):
-        current_row = self.table.currentRow()
-        if current_row >= 0:
-            emp_id = self.table.item(current_row, 6).text()
-            employee = self.data_manager.get_employee_by_id(emp_id)
-
-            if employee:
-                dialog = TaskHistoryDialog(self, employee)
-                dialog.exec_()
+        employee = self.current_employee()
+        if employee:
+            dialog = TaskHistoryDialog(self, self.data_manager, employee)
+            dialog.exec_()
 
+    @timed
     def filter_table(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.table.rowCount()):
-            match = False
-            for col in [1, 3, 4]:  # ФИО, Должность, Задача
-                item = self.table.item(row, col)
-                if item and search_text in item.text().lower():
-                    match = True
-                    break
-            self.table.setRowHidden(row, not match)
+        self.search_timer.stop()
+        self.model.set_filter(
+            self.data_manager.search_employees(self.search_input.text()))
 
+    def on_data_changed(self, collection, change, key, employee):
+        if collection != "employees":
+            return
+        if change == "reset":
+            self.update_table()
+            return
+
+        if change == "add":
+            self.model.employee_added(employee)
+        elif change == "remove":
+            self.model.employee_removed(employee)
+        else:
+            self.model.employee_changed(employee)
+        if change != "remove":
+            self.model.set_visible(employee, self.data_manager.employee_matches(
+                employee, self.search_input.text()))
+
+    @timed
     def update_table(self):
-        self.table.setRowCount(len(self.employees))
-        for row, employee in enumerate(self.employees):
-            self.table.setItem(row, 0, QTableWidgetItem(employee["id"]))
-            self.table.setItem(row, 1, QTableWidgetItem(employee["full_name"]))
-            self.table.setItem(
-                row, 2, QTableWidgetItem(employee["birth_date"]))
-            self.table.setItem(row, 3, QTableWidgetItem(employee["position"]))
-            self.table.setItem(row, 4, QTableWidgetItem(
-                employee["current_task"]))
-            self.table.setItem(
-                row, 5, QTableWidgetItem(employee.get("status", "Активен")))
-            self.table.setItem(row, 6, QTableWidgetItem(employee["id"]))
+        self.model.refresh()
+        if self.search_input.text().strip():
+            self.filter_table()
 
     def save_data(self):
-        try:
-            self.data_manager.save_all_data()
-            QMessageBox.information(self, "Успех", "Данные сохранены!")
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Ошибка", f"Не удалось сохранить данные: {str(e)}")
+        self.data_manager.request_save(compact=True)
 
     def show_context_menu(self, position):
         action = QMenu().exec_(self.table.viewport().mapToGlobal(position))
@@ -337,6 +708,7 @@ class StaffPage(QWidget):
 
 class EmployeeDialog(QDialog):
 
+    @timed
     def __init__(self, parent=None, employees=None, employee=None):
         super().__init__(parent)
         self.employee = employee
@@ -415,58 +787,215 @@ class EmployeeDialog(QDialog):
         )
 
 
+class TaskHistoryModel(QAbstractTableModel):
+
+    COLUMNS = [
+        ("Задача", "task"),
+        ("Дата начала", "start_date"),
+        ("Дата окончания", "end_date"),
+        ("Тип", "type"),
+    ]
+    PAGE_SIZE = 200
+
+    def __init__(self, data_manager, employee, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.employee = employee
+        self.keys = []
+        self.rows = []
+        self.date_from = None
+        self.date_to = None
+        self.sort_field = "start_date"
+        self.descending = False
+        self.requery()
+
+    def requery(self):
+        # Выборка дает только ключи строк; записи читаются страницами,
+        # первая - сразу, остальные - по мере прокрутки через fetchMore
+        self.beginResetModel()
+        self.keys = self.data_manager.query_history(
+            self.employee, self.date_from, self.date_to,
+            self.sort_field, self.descending)
+        self.rows = self.data_manager.fetch_history(
+            self.employee, self.keys[:self.PAGE_SIZE])
+        self.endResetModel()
+
+    def total(self):
+        return len(self.keys)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        entry = self.rows[index.row()]
+        field = self.COLUMNS[index.column()][1]
+        if field == "type":
+            return entry.get("type", "смена")
+        return entry.get(field, "")
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.rows) < len(self.keys)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        start = len(self.rows)
+        keys = self.keys[start:start + self.PAGE_SIZE]
+        if not keys:
+            return
+        entries = self.data_manager.fetch_history(self.employee, keys)
+        self.beginInsertRows(QModelIndex(), start, start + len(entries) - 1)
+        self.rows.extend(entries)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        field = self.COLUMNS[column][1]
+        descending = order == Qt.DescendingOrder
+        if (field, descending) == (self.sort_field, self.descending):
+            return
+        self.sort_field = field
+        self.descending = descending
+        self.requery()
+
+    def set_period(self, date_from, date_to):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.requery()
+
+
 class TaskHistoryDialog(QDialog):
 
-    def __init__(self, parent=None, employee=None):
+    GROUPINGS = [("По месяцам", "month"), ("По годам", "year")]
+
+    @timed
+    def __init__(self, parent=None, data_manager=None, employee=None):
         super().__init__(parent)
+        self.data_manager = data_manager
         self.employee = employee
         self.init_ui()
+        self.update_summary()
 
     def init_ui(self):
         self.setWindowTitle(f"История задач - {self.employee['full_name']}")
-        self.setFixedSize(600, 400)
+        self.resize(820, 500)
 
         layout = QVBoxLayout()
-
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(4)
-        self.history_table.setHorizontalHeaderLabels(
-            ["Задача", "Дата начала", "Дата окончания", "Тип"]
+        layout.addWidget(
+            QLabel(f"История задач сотрудника: {self.employee['full_name']}")
         )
 
+        filter_layout = QHBoxLayout()
+        self.period_check = QCheckBox("Период с")
+        self.date_from = QDateEdit(QDate.currentDate().addYears(-1))
+        self.date_to = QDateEdit(QDate.currentDate())
+        for date_edit in (self.date_from, self.date_to):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.setEnabled(False)
+            date_edit.dateChanged.connect(lambda: self.on_period_changed())
+        self.period_check.toggled.connect(lambda: self.on_period_toggled())
+
+        self.grouping_combo = QComboBox()
+        for title, period in self.GROUPINGS:
+            self.grouping_combo.addItem(title, period)
+        self.grouping_combo.currentIndexChanged.connect(
+            lambda: self.update_summary())
+
+        filter_layout.addWidget(self.period_check)
+        filter_layout.addWidget(self.date_from)
+        filter_layout.addWidget(QLabel("по"))
+        filter_layout.addWidget(self.date_to)
+        filter_layout.addStretch()
+        filter_layout.addWidget(QLabel("Смены задач:"))
+        filter_layout.addWidget(self.grouping_combo)
+        layout.addLayout(filter_layout)
+
+        self.model = TaskHistoryModel(self.data_manager, self.employee, self)
+
+        self.history_table = QTableView()
+        self.history_table.setModel(self.model)
+        self.history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.history_table.verticalHeader().setSectionResizeMode(
+            QHeaderView.Fixed)
         header = self.history_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSortIndicator(1, Qt.AscendingOrder)
+        self.history_table.setSortingEnabled(True)
 
-        history = self.employee.get("task_history", [])
-        self.history_table.setRowCount(len(history))
+        self.counts_table = QTableWidget(0, 2)
+        self.counts_table.setHorizontalHeaderLabels(["Период", "Смен"])
+        self.counts_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.counts_table.verticalHeader().setVisible(False)
+        self.counts_table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
 
-        for row, task in enumerate(history):
-            self.history_table.setItem(
-                row, 0, QTableWidgetItem(task.get("task", "")))
-            self.history_table.setItem(
-                row, 1, QTableWidgetItem(task.get("start_date", ""))
-            )
-            self.history_table.setItem(
-                row, 2, QTableWidgetItem(task.get("end_date", ""))
-            )
-            self.history_table.setItem(
-                row, 3, QTableWidgetItem(task.get("type", "смена"))
-            )
-
-        layout.addWidget(
-            QLabel(f"История задач сотрудника: {self.employee['full_name']}")
-        )
-        layout.addWidget(self.history_table)
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.history_table)
+        splitter.addWidget(self.counts_table)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+        layout.addWidget(splitter)
 
         btn_layout = QHBoxLayout()
+        self.summary_label = QLabel()
         btn_close = QPushButton("Закрыть")
         btn_close.clicked.connect(self.close)
+        btn_layout.addWidget(self.summary_label)
         btn_layout.addStretch()
         btn_layout.addWidget(btn_close)
 
         layout.addLayout(btn_layout)
         self.setLayout(layout)
 
+    def period(self):
+        if not self.period_check.isChecked():
+            return None, None
+        return (
+            self.date_from.date().toString("yyyy-MM-dd"),
+            self.date_to.date().toString("yyyy-MM-dd"),
+        )
+
+    def on_period_toggled(self):
+        enabled = self.period_check.isChecked()
+        self.date_from.setEnabled(enabled)
+        self.date_to.setEnabled(enabled)
+        self.apply_period()
+
+    def on_period_changed(self):
+        if self.period_check.isChecked():
+            self.apply_period()
+
+    def apply_period(self):
+        self.model.set_period(*self.period())
+        self.update_summary()
+
+    def update_summary(self):
+        # Счетчики по периодам считает хранилище истории, а не таблица
+        date_from, date_to = self.period()
+        counts = self.data_manager.history_period_counts(
+            self.employee, date_from, date_to,
+            self.grouping_combo.currentData())
+
+        self.counts_table.setRowCount(len(counts))
+        for row, (period, count) in enumerate(counts.items()):
+            self.counts_table.setItem(
+                row, 0, QTableWidgetItem(period or "без даты"))
+            item = QTableWidgetItem(str(count))
+            item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.counts_table.setItem(row, 1, item)
+
+        self.summary_label.setText(f"Записей: {self.model.total()}")
+
 
 class DocumentsPage(QWidget):
     
@@ -476,17 +1005,53 @@ class DocumentsPage(QWidget):
         self.documents = data_manager.documents
         self.documents_folder = "documents"
         os.makedirs(self.documents_folder, exist_ok=True)
+        self.blobs = BlobStore(self.documents_folder)
+        self.importer = DocumentImporter(self.blobs)
+        self.importer.file_done.connect(self.on_file_imported)
+        self.import_progress = None
+        self.import_done = 0
+        self.import_total = 0
+        self.preview = None
+        self.preview_offset = 0
+        self.items_by_name = {}
+        self.watcher = DocumentWatcher()
+        self.watcher.files_changed.connect(self.on_files_changed)
+
+        # Пакет изменений перестраивает слежение и индекс один раз
+        self.track_timer = QTimer(self)
+        self.track_timer.setSingleShot(True)
+        self.track_timer.setInterval(0)
+        self.track_timer.timeout.connect(self.track_documents)
+        try:
+            self.search_index = DocumentIndex()
+        except Exception as e:
+            print(f"Ошибка открытия поискового индекса: {e}")
+            self.search_index = None
         self.init_ui()
+        self.track_documents()
+        self.data_manager.subscribe(self.on_data_changed)
 
     def init_ui(self):
         layout = QHBoxLayout()
 
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Поиск по содержимому...")
+        self.search_input.setEnabled(self.search_index is not None)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.refresh_list)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
         self.doc_list = QListWidget()
         self.doc_list.currentItemChanged.connect(self.show_document)
         self.doc_list.itemDoubleClicked.connect(self.open_file_external)
 
         self.viewer = QTextEdit()
         self.viewer.setReadOnly(True)
+        self.viewer.verticalScrollBar().valueChanged.connect(
+            self.on_viewer_scrolled)
 
         self.file_info = QLabel("Выберите файл для просмотра")
         self.file_info.setStyleSheet(
@@ -497,6 +1062,7 @@ class DocumentsPage(QWidget):
         self.btn_add_folder = QPushButton("📁 Добавить папку")
         self.btn_delete = QPushButton("🗑️ Удалить файл")
         self.btn_open_external = QPushButton("🔍 Открыть внешне")
+        self.btn_goto_line = QPushButton("🔢 Перейти к строке")
         self.btn_save = QPushButton("💾 Сохранить изменения")
         self.btn_refresh = QPushButton("🔄 Обновить список")
 
@@ -505,6 +1071,7 @@ class DocumentsPage(QWidget):
             self.btn_add_folder,
             self.btn_delete,
             self.btn_open_external,
+            self.btn_goto_line,
             self.btn_save,
             self.btn_refresh,
         ]:
@@ -517,11 +1084,19 @@ class DocumentsPage(QWidget):
         self.btn_add_folder.clicked.connect(self.add_folder)
         self.btn_delete.clicked.connect(self.delete_document)
         self.btn_open_external.clicked.connect(self.open_file_external)
+        self.btn_goto_line.clicked.connect(self.go_to_line)
         self.btn_save.clicked.connect(self.save_document)
-        self.btn_refresh.clicked.connect(self.refresh_list)
+        self.btn_refresh.clicked.connect(lambda: self.refresh_list())
 
         splitter = QSplitter(Qt.Horizontal)
-        splitter.addWidget(self.doc_list)
+
+        left_widget = QWidget()
+        left_layout = QVBoxLayout()
+        left_layout.setContentsMargins(0, 0, 0, 0)
+        left_layout.addWidget(self.search_input)
+        left_layout.addWidget(self.doc_list)
+        left_widget.setLayout(left_layout)
+        splitter.addWidget(left_widget)
 
         right_widget = QWidget()
         right_layout = QVBoxLayout()
@@ -538,13 +1113,108 @@ class DocumentsPage(QWidget):
 
         self.refresh_list()
 
+    @timed
     def refresh_list(self):
         self.doc_list.clear()
+        self.items_by_name = {}
+        query = self.search_input.text().strip()
+        if query and self.search_index is not None:
+            self.show_search_results(query)
+            return
+
         for doc in self.documents:
-            item = QListWidgetItem(doc["name"])
-            item.setData(Qt.UserRole, doc)
+            self.add_item(doc)
+
+    def add_item(self, doc_data):
+        item = QListWidgetItem(doc_data["name"])
+        item.setData(Qt.UserRole, doc_data["name"])
+        item.setToolTip(document_summary(doc_data))
+        self.doc_list.addItem(item)
+        self.items_by_name[doc_data["name"]] = item
+
+    def show_search_results(self, query):
+        try:
+            hits = self.search_index.search(query)
+        except Exception as e:
+            self.file_info.setText(f"Ошибка поиска: {str(e)}")
+            return
+
+        for name, snippet in hits:
+            if self.data_manager.get_document_by_name(name) is None:
+                continue
+            snippet = " ".join(snippet.split())
+            item = QListWidgetItem(f"{name}\n    {snippet}")
+            item.setData(Qt.UserRole, name)
+            item.setToolTip(snippet)
             self.doc_list.addItem(item)
 
+    def on_data_changed(self, collection, change, name, doc_data):
+        if collection != "documents":
+            return
+        self.track_timer.start()
+        if change == "reset" or self.search_input.text().strip():
+            # Результаты поиска зависят от индекса и пересобираются целиком
+            self.search_timer.start()
+            return
+
+        item = self.items_by_name.get(name)
+        if change == "add":
+            self.add_item(doc_data)
+        elif change == "remove":
+            if item is not None:
+                del self.items_by_name[name]
+                self.doc_list.takeItem(self.doc_list.row(item))
+        elif item is not None:
+            item.setToolTip(document_summary(doc_data))
+            if item is self.doc_list.currentItem():
+                self.file_info.setText(f"Файл: {document_summary(doc_data)}")
+
+    def track_documents(self):
+        self.watcher.set_paths(
+            doc["path"] for doc in self.documents)
+
+        # Индексация идет в фоне; обновляются только изменившиеся документы
+        if self.search_index is not None:
+            documents = [dict(doc) for doc in self.documents]
+            self.importer.executor.submit(self.search_index.sync, documents)
+
+    def on_files_changed(self, paths):
+        updates = []
+        released = []
+        for path in paths:
+            stat = file_signature(path)
+            if stat is None:
+                continue
+            modified = datetime.fromtimestamp(
+                stat[1] / 1e9).strftime("%Y-%m-%d %H:%M")
+
+            for doc_data in self.data_manager.get_documents_by_path(path):
+                changes = {"size": stat[0], "modified": modified}
+                if doc_data.get("sha256"):
+                    # Блоб изменили в обход программы: кладем под новым хешем
+                    try:
+                        digest, blob_path = self.blobs.put(path)
+                    except OSError as e:
+                        print(f"Ошибка обновления документа {doc_data['name']}: {e}")
+                        continue
+                    if digest != doc_data["sha256"]:
+                        changes.update(sha256=digest, path=blob_path)
+                        released.append(dict(doc_data))
+                if any(doc_data.get(key) != value
+                       for key, value in changes.items()):
+                    updates.append((doc_data, changes))
+
+        if not updates:
+            return
+
+        self.data_manager.update_documents(updates)
+        for doc_data in released:
+            self.release_file(doc_data)
+        self.data_manager.request_save()
+
+    def document_for_item(self, item):
+        return self.data_manager.get_document_by_name(item.data(Qt.UserRole))
+
     def add_document(self):
         file_paths, _ = QFileDialog.getOpenFileNames(
             self,
@@ -553,64 +1223,114 @@ class DocumentsPage(QWidget):
             "Файлы (*);;Текстовые ;;Документы ;;Изображения ",
         )
         if file_paths:
-            for file_path in file_paths:
-                self.import_file(file_path)
+            self.import_files(file_paths)
 
     def add_folder(self):
         folder_path = QFileDialog.getExistingDirectory(self, "Выберите папку")
         if folder_path:
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    self.import_file(file_path)
-
-    def import_file(self, file_path):
-        try:
-            filename = os.path.basename(file_path)
-            file_ext = os.path.splitext(filename)[1].lower()
+            self.import_files(
+                os.path.join(root, file)
+                for root, dirs, files in os.walk(folder_path)
+                for file in files
+            )
 
-            if any(doc["name"] == filename for doc in self.documents):
-                reply = QMessageBox.question(
-                    self,
-                    "Файл существует",
-                    f"Файл {filename} уже существует. Заменить?",
-                    QMessageBox.Yes | QMessageBox.No,
-                )
-                if reply == QMessageBox.No:
-                    return
+    def import_files(self, file_paths):
+        if self.import_progress is not None:
+            return
 
-            dest_path = os.path.join(self.documents_folder, filename)
-            shutil.copy2(file_path, dest_path)
+        candidates = {}
+        conflicts = set()
+        for file_path in file_paths:
+            filename = os.path.basename(file_path)
+            if (filename in candidates
+                    or self.data_manager.get_document_by_name(filename)):
+                conflicts.add(filename)
+            candidates.setdefault(filename, []).append(file_path)
+
+        replace = True
+        if conflicts:
+            if len(conflicts) == 1:
+                text = f"Файл {next(iter(conflicts))} уже существует. Заменить?"
+            else:
+                text = f"Файлов с существующими именами: {len(conflicts)}. Заменить их?"
+            reply = QMessageBox.question(
+                self,
+                "Файл существует",
+                text,
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+            )
+            if reply == QMessageBox.Cancel:
+                return
+            replace = reply == QMessageBox.Yes
+
+        # Конфликты решаются один раз на весь пакет
+        jobs = []
+        for filename, paths in candidates.items():
+            if filename not in conflicts or replace:
+                jobs.append((filename, paths[-1]))
+            elif not self.data_manager.get_document_by_name(filename):
+                jobs.append((filename, paths[0]))
+        if not jobs:
+            return
 
-            doc_data = {
-                "name": filename,
-                "path": dest_path,
-                "size": os.path.getsize(dest_path),
-                "modified": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "type": file_ext,
-            }
+        self.imported_docs = []
+        self.import_errors = []
+        # Счет ведется на странице: после отмены диалог сбрасывает свое
+        # значение, а ответ придет от каждого задания
+        self.import_done = 0
+        self.import_total = len(jobs)
+        self.import_progress = QProgressDialog(
+            "Импорт файлов...", "Отмена", 0, len(jobs), self)
+        self.import_progress.setWindowTitle("Добавление файлов")
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(300)
+        self.import_progress.setAutoClose(False)
+        self.import_progress.setAutoReset(False)
+        self.import_progress.canceled.connect(self.importer.cancel)
+        self.import_progress.setValue(0)
+        self.importer.start(jobs)
+
+    def on_file_imported(self, doc_data, error):
+        if doc_data is not None:
+            self.imported_docs.append(doc_data)
+        elif error:
+            self.import_errors.append(error)
+
+        progress = self.import_progress
+        self.import_done += 1
+        if not progress.wasCanceled():
+            progress.setValue(self.import_done)
+        if self.import_done < self.import_total:
+            return
 
-            existing_index = next(
-                (i for i, doc in enumerate(self.documents)
-                 if doc["name"] == filename),
-                -1,
-            )
-            if existing_index >= 0:
-                self.documents[existing_index] = doc_data
-            else:
-                self.documents.append(doc_data)
+        self.import_progress = None
+        progress.close()
+        progress.deleteLater()
 
-            self.refresh_list()
-            self.data_manager.save_all_data()
+        # Метаданные сохраняются одной записью в конце пакета; при отмене
+        # регистрируются файлы, которые успели скопироваться
+        replaced = [
+            self.data_manager.get_document_by_name(doc["name"])
+            for doc in self.imported_docs
+        ]
+        self.data_manager.put_documents(self.imported_docs)
+        for doc_data in replaced:
+            if doc_data is not None:
+                self.release_file(doc_data)
+        self.data_manager.request_save()
 
-        except Exception as e:
+        if self.import_errors:
             QMessageBox.critical(
-                self, "Ошибка", f"Не удалось добавить файл: {str(e)}")
+                self,
+                "Ошибка",
+                f"Не удалось добавить файлов: {len(self.import_errors)}\n"
+                + "\n".join(self.import_errors[:10]),
+            )
 
     def delete_document(self):
         current_item = self.doc_list.currentItem()
         if current_item:
-            doc_data = current_item.data(Qt.UserRole)
+            doc_data = self.document_for_item(current_item)
             reply = QMessageBox.question(
                 self,
                 "Подтверждение",
@@ -619,17 +1339,10 @@ class DocumentsPage(QWidget):
             )
             if reply == QMessageBox.Yes:
                 try:
-                    if os.path.exists(doc_data["path"]):
-                        os.remove(doc_data["path"])
-
-                    self.documents = [
-                        doc for doc in self.documents if doc["name"] != doc_data["name"]]
-                    self.data_manager.documents = self.documents
-                    self.data_manager.save_all_data()
-
-                    self.refresh_list()
-                    self.viewer.clear()
-                    self.file_info.setText("Выберите файл для просмотра")
+                    self.close_preview()
+                    self.data_manager.remove_document(doc_data)
+                    self.release_file(doc_data)
+                    self.data_manager.request_save()
 
                 except Exception as e:
                     QMessageBox.critical(
@@ -639,17 +1352,34 @@ class DocumentsPage(QWidget):
     def save_document(self):
         current_item = self.doc_list.currentItem()
         if current_item:
-            doc_data = current_item.data(Qt.UserRole)
+            doc_data = self.document_for_item(current_item)
             try:
-                if doc_data["type"] in [".txt", ".log", ".csv"]:
-                    with open(doc_data["path"], "w", encoding="utf-8") as f:
-                        f.write(self.viewer.toPlainText())
-
-                    doc_data["modified"] = datetime.now().strftime(
-                        "%Y-%m-%d %H:%M")
-                    doc_data["size"] = os.path.getsize(doc_data["path"])
-
-                    self.data_manager.save_all_data()
+                if self.preview is not None:
+                    QMessageBox.warning(
+                        self,
+                        "Предупреждение",
+                        "Большой файл открыт только для просмотра",
+                    )
+                elif doc_data["type"] in [".txt", ".log", ".csv"]:
+                    # Блоб может принадлежать нескольким документам,
+                    # поэтому новое содержимое сохраняется отдельным блобом
+                    content = self.viewer.toPlainText().encode("utf-8")
+                    digest, blob_path = self.blobs.put_bytes(content)
+                    previous = dict(doc_data)
+
+                    self.data_manager.update_document(
+                        doc_data,
+                        {
+                            "path": blob_path,
+                            "sha256": digest,
+                            "modified": datetime.now().strftime(
+                                "%Y-%m-%d %H:%M"),
+                            "size": len(content),
+                        }
+                    )
+                    if previous["path"] != blob_path:
+                        self.release_file(previous)
+                    self.data_manager.request_save()
                     QMessageBox.information(
                         self, "Успех", "Изменения сохранены!")
                 else:
@@ -663,21 +1393,33 @@ class DocumentsPage(QWidget):
                     self, "Ошибка", f"Не удалось сохранить файл: {str(e)}"
                 )
 
+    def release_file(self, doc_data):
+        # Блоб удаляется, когда на него не ссылается ни один документ
+        digest = doc_data.get("sha256")
+        if digest:
+            if not self.data_manager.document_references(digest):
+                self.blobs.remove(digest)
+        elif os.path.exists(doc_data["path"]):
+            os.remove(doc_data["path"])
+
     def show_document(self, current, previous):
-        if current:
-            doc_data = current.data(Qt.UserRole)
-            self.file_info.setText(
-                f"Файл: {doc_data['name']} | Размер: {doc_data['size']} байт | Изменен: {doc_data['modified']}")
+        self.close_preview()
+        if current is None:
+            self.viewer.clear()
+            self.file_info.setText("Выберите файл для просмотра")
+        else:
+            doc_data = self.document_for_item(current)
+            self.file_info.setText(f"Файл: {document_summary(doc_data)}")
 
             try:
-                if doc_data["type"] in [
-                    ".txt",
-                    ".log",
-                    ".csv",
-                    ".json",
-                    ".xml",
-                    ".html",
-                ]:
+                if doc_data["type"] in TEXT_TYPES:
+                    if os.path.getsize(doc_data["path"]) > PREVIEW_LIMIT:
+                        # Большой файл показывается постранично через mmap
+                        self.preview = PagedFile(doc_data["path"])
+                        self.file_info.setText(
+                            self.file_info.text() + " | Только просмотр")
+                        self.show_preview_from(0)
+                        return
                     with open(doc_data["path"], "r", encoding="utf-8") as f:
                         content = f.read()
                     self.viewer.setPlainText(content)
@@ -691,23 +1433,215 @@ class DocumentsPage(QWidget):
                 self.viewer.setPlainText(f"Ошибка чтения файла: {str(e)}")
                 self.viewer.setReadOnly(True)
 
+    def close_preview(self):
+        if self.preview is not None:
+            self.preview.close()
+            self.preview = None
+
+    def show_preview_from(self, offset):
+        self.viewer.setReadOnly(True)
+        self.preview_offset = offset
+        self.viewer.clear()
+        self.load_next_page()
+
+    def load_next_page(self):
+        if self.preview is None or self.preview_offset >= self.preview.size:
+            return
+        text, self.preview_offset = self.preview.read_page(self.preview_offset)
+        cursor = QTextCursor(self.viewer.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def on_viewer_scrolled(self, value):
+        scroll_bar = self.viewer.verticalScrollBar()
+        if (self.preview is not None
+                and value >= scroll_bar.maximum() - scroll_bar.pageStep()):
+            self.load_next_page()
+
+    def go_to_line(self):
+        if self.doc_list.currentItem() is None:
+            return
+        line, ok = QInputDialog.getInt(
+            self, "Перейти к строке", "Номер строки:", 1, 1, 2147483647)
+        if not ok:
+            return
+
+        if self.preview is not None:
+            offset = self.preview.line_offset(line)
+            if offset is None:
+                QMessageBox.warning(
+                    self, "Предупреждение", f"В файле нет строки {line}")
+                return
+            self.show_preview_from(offset)
+        else:
+            block = self.viewer.document().findBlockByNumber(line - 1)
+            if not block.isValid():
+                QMessageBox.warning(
+                    self, "Предупреждение", f"В файле нет строки {line}")
+                return
+            self.viewer.setTextCursor(QTextCursor(block))
+            self.viewer.ensureCursorVisible()
+
     def open_file_external(self):
         current_item = self.doc_list.currentItem()
         if current_item:
-            doc_data = current_item.data(Qt.UserRole)
+            doc_data = self.document_for_item(current_item)
             try:
+                path = doc_data["path"]
+                if doc_data.get("sha256"):
+                    path = self.blobs.checkout(doc_data["sha256"], doc_data["name"])
+
                 if sys.platform == "win32":
-                    os.startfile(doc_data["path"])
+                    os.startfile(path)
                 elif sys.platform == "darwin":
-                    os.system(f"open '{doc_data['path']}'")
+                    os.system(f"open '{path}'")
                 else:
-                    os.system(f"xdg-open '{doc_data['path']}'")
+                    os.system(f"xdg-open '{path}'")
             except Exception as e:
                 QMessageBox.critical(
                     self, "Ошибка", f"Не удалось открыть файл: {str(e)}"
                 )
 
 
+def document_summary(doc_data):
+    return f"{doc_data['name']} | Размер: {doc_data['size']} байт | Изменен: {doc_data['modified']}"
+
+
+class TaskListModel(QAbstractListModel):
+
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.tasks = list(data_manager.tasks)
+        self.visible = None
+        self.positions = None
+        self.rows = None
+
+    def shown(self):
+        return self.tasks if self.visible is None else self.visible
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.shown())
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self.shown()[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{task.text} | 👤{task.assignee_name} | 📊{task.status} | ⚡{task.priority}"
+        if role == Qt.UserRole:
+            return task.id
+        return None
+
+    def task_at(self, row):
+        return self.shown()[row]
+
+    def row_of(self, task):
+        if self.rows is None:
+            self.rows = {t.id: row for row, t in enumerate(self.shown())}
+        return self.rows.get(task.id, -1)
+
+    def set_filter(self, ids):
+        self.beginResetModel()
+        if ids is None:
+            self.visible = None
+        else:
+            self.visible = [
+                self.tasks[row]
+                for row in sorted(self.position(task_id) for task_id in ids)
+            ]
+        self.rows = None
+        self.endResetModel()
+
+    def task_added(self, task):
+        row = len(self.tasks)
+        if self.visible is not None:
+            self.tasks.append(task)
+            if self.positions is not None:
+                self.positions[task["id"]] = row
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.tasks.append(task)
+        if self.rows is not None:
+            self.rows[task["id"]] = row
+        if self.positions is not None:
+            self.positions[task["id"]] = row
+        self.endInsertRows()
+
+    def task_changed(self, task):
+        row = self.row_of(task)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    def set_visible(self, task, visible):
+        if self.visible is None:
+            return
+        row = self.row_of(task)
+        if visible and row < 0:
+            row = sorted_position(
+                self.visible, self.position(task["id"]),
+                lambda t: self.position(t.id))
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.visible.insert(row, task)
+            self.rows = None
+            self.endInsertRows()
+        elif not visible and row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.visible.pop(row)
+            self.rows = None
+            self.endRemoveRows()
+
+    def position(self, task_id):
+        if self.positions is None:
+            self.positions = {
+                task.id: row for row, task in enumerate(self.tasks)}
+        return self.positions[task_id]
+
+    def refresh(self):
+        self.beginResetModel()
+        self.tasks = list(self.data_manager.tasks)
+        self.visible = None
+        self.positions = None
+        self.rows = None
+        self.endResetModel()
+
+
+class TaskItemDelegate(QStyledItemDelegate):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.colors = {}
+
+    def color_for(self, task):
+        key = (task.status, task.priority)
+        color = self.colors.get(key)
+        if color is None:
+            color = self.colors[key] = QColor(*task_color(*key))
+        return color
+
+    def paint(self, painter, option, index):
+        task = index.model().task_at(index.row())
+        painter.fillRect(option.rect, self.color_for(task))
+        super().paint(painter, option, index)
+
+
+def task_color(status, priority):
+    if status == "Завершено":
+        return 50, 150, 50
+    if status == "В процессе":
+        if priority == "Критичный":
+            return 200, 50, 50
+        if priority == "Высокий":
+            return 220, 120, 50
+        return 150, 150, 50
+    if priority == "Критичный":
+        return 150, 50, 50
+    if priority == "Высокий":
+        return 180, 100, 50
+    return 80, 80, 80
+
+
 class TodoPage(QWidget):
 
     def __init__(self, data_manager):
@@ -715,7 +1649,9 @@ class TodoPage(QWidget):
         super().__init__()
         self.data_manager = data_manager
         self.tasks = data_manager.tasks
+        self.assignee_names = None
         self.init_ui()
+        self.data_manager.subscribe(self.on_data_changed)
 
     def init_ui(self):
         
@@ -726,7 +1662,6 @@ class TodoPage(QWidget):
         self.task_input.setPlaceholderText("Введите новую задачу...")
 
         self.assignee_combo = QComboBox()
-        self.update_assignee_combo()
 
         self.progress_combo = QComboBox()
         self.progress_combo.addItems(
@@ -755,26 +1690,27 @@ class TodoPage(QWidget):
             ["Все статусы", "К выполнению", "В процессе", "Завершено"]
         )
         self.filter_assignee = QComboBox()
-        self.filter_assignee.addItems(
-            ["Все исполнители"]
-            + [emp["full_name"] for emp in self.data_manager.employees]
-        )
+        self.filter_assignee.addItem("Все исполнители")
         self.filter_priority = QComboBox()
         self.filter_priority.addItems(
             ["Все приоритеты", "Низкий", "Средний", "Высокий", "Критичный"]
         )
 
-        self.filter_status.currentTextChanged.connect(self.filter_tasks)
-        self.filter_assignee.currentTextChanged.connect(self.filter_tasks)
-        self.filter_priority.currentTextChanged.connect(self.filter_tasks)
+        self.filter_status.currentTextChanged.connect(lambda: self.filter_tasks())
+        self.filter_assignee.currentTextChanged.connect(lambda: self.filter_tasks())
+        self.filter_priority.currentTextChanged.connect(lambda: self.filter_tasks())
 
         filter_layout.addWidget(self.filter_status)
         filter_layout.addWidget(self.filter_assignee)
         filter_layout.addWidget(self.filter_priority)
         filter_layout.addStretch()
 
-        self.todo_list = QListWidget()
-        self.todo_list.itemDoubleClicked.connect(self.edit_task)
+        self.model = TaskListModel(self.data_manager, self)
+        self.todo_list = QListView()
+        self.todo_list.setModel(self.model)
+        self.todo_list.setItemDelegate(TaskItemDelegate(self.todo_list))
+        self.todo_list.setUniformItemSizes(True)
+        self.todo_list.doubleClicked.connect(self.edit_task)
 
         self.btn_add_task.clicked.connect(self.add_task)
 
@@ -783,14 +1719,26 @@ class TodoPage(QWidget):
         layout.addWidget(self.todo_list)
 
         self.setLayout(layout)
-        self.update_list()
+        self.update_assignee_combo()
 
     def update_assignee_combo(self):
-        
+        names = [emp["full_name"] for emp in self.data_manager.employees]
+        if names == self.assignee_names:
+            return
+        self.assignee_names = names
+
+        current = self.assignee_combo.currentText()
         self.assignee_combo.clear()
-        self.assignee_combo.addItems(
-            [emp["full_name"] for emp in self.data_manager.employees]
-        )
+        self.assignee_combo.addItems(names)
+        self.assignee_combo.setCurrentText(current)
+
+        current = self.filter_assignee.currentText()
+        self.filter_assignee.blockSignals(True)
+        self.filter_assignee.clear()
+        self.filter_assignee.addItem("Все исполнители")
+        self.filter_assignee.addItems(names)
+        self.filter_assignee.setCurrentText(current)
+        self.filter_assignee.blockSignals(False)
 
     def add_task(self):
         
@@ -800,14 +1748,7 @@ class TodoPage(QWidget):
         priority = self.priority_combo.currentText()
 
         if task_text and assignee_name:
-            assignee = next(
-                (
-                    emp
-                    for emp in self.data_manager.employees
-                    if emp["full_name"] == assignee_name
-                ),
-                None,
-            )
+            assignee = self.data_manager.get_employee_by_name(assignee_name)
 
             if assignee:
                 task = {
@@ -820,85 +1761,79 @@ class TodoPage(QWidget):
                     "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
                     "deadline": None,
                 }
-                self.tasks.append(task)
-                self.update_list()
-
-                assignee["current_task"] = task_text
+                self.data_manager.add_task(task)
+                self.data_manager.update_employee(
+                    assignee, {"current_task": task_text})
 
                 self.task_input.clear()
-                self.data_manager.save_all_data()
+                self.data_manager.request_save()
 
-    def edit_task(self, item):
-        task_id = item.data(Qt.UserRole)
-        task = next((t for t in self.tasks if t["id"] == task_id), None)
+    def edit_task(self, index):
+        task = self.model.task_at(index.row())
 
         if task:
-            dialog = TodoTaskDialog(self, self.data_manager.employees, task)
+            dialog = TodoTaskDialog(self, self.data_manager, task)
             if dialog.exec_():
                 updated_task = dialog.get_data()
-                task.update(updated_task)
+                self.data_manager.update_task(task, updated_task)
+                self.data_manager.request_save()
+
+    def on_data_changed(self, collection, change, key, item):
+        if collection == "employees":
+            self.update_assignee_combo()
+        elif collection == "tasks":
+            if change == "reset":
                 self.update_list()
-                self.data_manager.save_all_data()
-
-    def update_list(self):
-        self.todo_list.clear()
-        for task in self.tasks:
-            item_text = f"{task['text']} | 👤{task['assignee_name']} | 📊{task['status']} | ⚡{task['priority']}"
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, task["id"])
-
-            if task["status"] == "Завершено":
-                item.setBackground(QColor(50, 150, 50))
-            elif task["status"] == "В процессе":
-                if task["priority"] == "Критичный":
-                    item.setBackground(QColor(200, 50, 50))
-                elif task["priority"] == "Высокий":
-                    item.setBackground(QColor(220, 120, 50))
-                else:
-                    item.setBackground(QColor(150, 150, 50))
+                return
+            if change == "add":
+                self.model.task_added(item)
             else:
-                if task["priority"] == "Критичный":
-                    item.setBackground(QColor(150, 50, 50))
-                elif task["priority"] == "Высокий":
-                    item.setBackground(QColor(180, 100, 50))
-                else:
-                    item.setBackground(QColor(80, 80, 80))
+                self.model.task_changed(item)
+            if self.model.visible is not None:
+                self.model.set_visible(item, all(
+                    item.id in bucket for bucket in self.filter_buckets()))
 
-            self.todo_list.addItem(item)
+    @timed
+    def update_list(self):
+        self.model.refresh()
+        self.filter_tasks()
 
-    def filter_tasks(self):
+    def filter_buckets(self):
+        # Корзины индексов DataManager для выбранных фильтров; задача видна,
+        # если она есть в каждой из них
         status_filter = self.filter_status.currentText()
         assignee_filter = self.filter_assignee.currentText()
         priority_filter = self.filter_priority.currentText()
 
-        for i in range(self.todo_list.count()):
-            item = self.todo_list.item(i)
-            task_id = item.data(Qt.UserRole)
-            task = next((t for t in self.tasks if t["id"] == task_id), None)
-
-            if task:
-                show = True
-                if (status_filter != "Все статусы") and (
-                    task["status"] != status_filter
-                ):
-                    show = False
-                if (assignee_filter != "Все исполнители") and (
-                    task["assignee_name"] != assignee_filter
-                ):
-                    show = False
-                if (priority_filter != "Все приоритеты") and (
-                    task["priority"] != priority_filter
-                ):
-                    show = False
-                item.setHidden(not show)
+        buckets = []
+        if status_filter != "Все статусы":
+            buckets.append(self.data_manager.tasks_by_status.get(
+                status_filter, {}))
+        if assignee_filter != "Все исполнители":
+            assignee = self.data_manager.get_employee_by_name(assignee_filter)
+            buckets.append(self.data_manager.tasks_by_assignee.get(
+                assignee["id"] if assignee else None, {}))
+        if priority_filter != "Все приоритеты":
+            buckets.append(self.data_manager.tasks_by_priority.get(
+                priority_filter, {}))
+        return buckets
+
+    @timed
+    def filter_tasks(self):
+        visible = None
+        for bucket in self.filter_buckets():
+            ids = bucket.keys()
+            visible = ids if visible is None else visible & ids
+        self.model.set_filter(visible)
 
 
 class TodoTaskDialog(QDialog):
 
-    def __init__(self, parent=None, employees=None, task=None):
+    @timed
+    def __init__(self, parent=None, data_manager=None, task=None):
         super().__init__(parent)
         self.task = task
-        self.employees = employees or []
+        self.data_manager = data_manager
         self.init_ui()
 
     def init_ui(self):
@@ -912,7 +1847,7 @@ class TodoTaskDialog(QDialog):
 
         self.assignee_combo = QComboBox()
         self.assignee_combo.addItems(
-            [emp["full_name"] for emp in self.employees])
+            [emp["full_name"] for emp in self.data_manager.employees])
 
         self.status_combo = QComboBox()
         self.status_combo.addItems(["К выполнению", "В процессе", "Завершено"])
@@ -947,14 +1882,8 @@ class TodoTaskDialog(QDialog):
         self.setLayout(layout)
 
     def get_data(self):
-        assignee = next(
-            (
-                emp
-                for emp in self.employees
-                if emp["full_name"] == self.assignee_combo.currentText()
-            ),
-            None,
-        )
+        assignee = self.data_manager.get_employee_by_name(
+            self.assignee_combo.currentText())
 
         return {
             "text": self.task_edit.toPlainText(),
@@ -966,18 +1895,97 @@ class TodoTaskDialog(QDialog):
         }
 
 
+class EventNotifier(QObject):
+
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.notified_events = set()
+        self.reminders = ReminderQueue()
+
+        # Таймер взводится только на ближайшее напоминание
+        self.notification_timer = QTimer(self)
+        self.notification_timer.setSingleShot(True)
+        self.notification_timer.timeout.connect(self.check_notifications)
+
+    def schedule_reminders(self):
+        now = datetime.now()
+        self.reminders.clear()
+        for date_str, event in self.data_manager.events_from(now):
+            self.reminders.schedule(date_str, event, now)
+        self.arm_notification_timer()
+
+    def schedule(self, date_str, event):
+        self.reminders.schedule(date_str, event)
+        self.arm_notification_timer()
+
+    def cancel(self, event):
+        self.reminders.cancel(event)
+        self.arm_notification_timer()
+
+    def on_data_changed(self, collection, change, date_str, event):
+        if collection != "events":
+            return
+        if change == "reset":
+            self.schedule_reminders()
+        elif change == "remove":
+            self.cancel(event)
+        else:
+            self.schedule(date_str, event)
+
+    def arm_notification_timer(self):
+        due = self.reminders.next_due()
+        if due is None:
+            self.notification_timer.stop()
+            return
+
+        # Не дольше часа, чтобы перевод системных часов не сбил напоминание
+        delay = (due - datetime.now()).total_seconds() * 1000
+        self.notification_timer.start(int(min(max(delay, 0), 3600 * 1000)))
+
+    @timed
+    def check_notifications(self):
+        for date_str, event in self.reminders.pop_due(datetime.now()):
+            event_id = f"{date_str}_{event['time']}_{event['title']}"
+
+            if event_id in self.notified_events:
+                continue
+
+            self.notified_events.add(event_id)
+            self.show_notification(date_str, event)
+
+        self.arm_notification_timer()
+
+    def show_notification(self, date_str, event):
+        msg = QMessageBox(self.parent())
+        msg.setIcon(QMessageBox.Information)
+        msg.setWindowTitle("🔔 Напоминание о событии")
+        msg.setText(f"Событие: {event['title']}")
+        msg.setInformativeText(
+            f"Время: {event['time']}\nИсполнитель: {event['assignee_name']}\nОписание: {event['description']}"
+        )
+        msg.addButton("ОК", QMessageBox.AcceptRole)
+        msg.addButton("Отложить (5 мин)", QMessageBox.RejectRole)
+
+        msg.setWindowFlags(msg.windowFlags() | Qt.WindowStaysOnTopHint)
+
+        result = msg.exec_()
+
+        if result == QMessageBox.RejectRole:
+            self.notified_events.discard(
+                f"{date_str}_{event['time']}_{event['title']}"
+            )
+            self.reminders.snooze(date_str, event)
+
+
 class CalendarPage(QWidget):
 
     def __init__(self, data_manager):
         super().__init__()
         self.data_manager = data_manager
         self.events = data_manager.events
-        self.notified_events = set()
         self.init_ui()
-
-        self.notification_timer = QTimer()
-        self.notification_timer.timeout.connect(self.check_notifications)
-        self.notification_timer.start(30000)
+        self.data_manager.subscribe(self.on_data_changed)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -1034,24 +2042,20 @@ class CalendarPage(QWidget):
         self.calendar.setSelectedDate(QDate.currentDate())
         self.show_events()
 
+    @timed
     def update_month_view(self):
         self.month_view.clear()
         current_date = QDate.currentDate()
-        current_month = current_date.toString("yyyy-MM")
 
-        month_events = []
-        for date_str, events in self.events.items():
-            if date_str.startswith(current_month):
-                for event in events:
-                    month_events.append(f"{date_str}: {event['title']}")
+        month_events = self.data_manager.events_in_month(
+            current_date.year(), current_date.month())
 
-        for event_str in sorted(month_events)[:10]:
-            self.month_view.addItem(event_str)
+        for date_str, event in month_events[:10]:
+            self.month_view.addItem(f"{date_str}: {event['title']}")
 
     def add_event(self):
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
-        dialog = EventDialog(
-            self, self.data_manager.employees, self.data_manager.tasks)
+        dialog = EventDialog(self, self.data_manager)
         if dialog.exec_():
             event_data = dialog.get_data()
 
@@ -1068,21 +2072,16 @@ class CalendarPage(QWidget):
                 "created": datetime.now().strftime("%Y-%m-%d %H:%M"),
             }
 
-            if selected_date not in self.events:
-                self.events[selected_date] = []
-
-            self.events[selected_date].append(event)
-            self.show_events()
-            self.update_month_view()
-            self.data_manager.save_all_data()
+            self.data_manager.add_event(selected_date, event)
+            self.data_manager.request_save()
 
     def delete_event(self):
         current_row = self.events_list.currentRow()
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
 
         if current_row >= 0 and selected_date in self.events:
-            if current_row < len(self.events[selected_date]):
-                event = self.events[selected_date][current_row]
+            if current_row < len(self.shown_events):
+                event = self.shown_events[current_row]
                 reply = QMessageBox.question(
                     self,
                     "Подтверждение",
@@ -1090,27 +2089,22 @@ class CalendarPage(QWidget):
                     QMessageBox.Yes | QMessageBox.No,
                 )
                 if reply == QMessageBox.Yes:
-                    self.events[selected_date].pop(current_row)
-                    self.show_events()
-                    self.update_month_view()
-                    self.data_manager.save_all_data()
+                    self.data_manager.remove_event(selected_date, event)
+                    self.data_manager.request_save()
 
     def edit_event(self, item):
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
         row = self.events_list.row(item)
 
-        if selected_date in self.events and row < len(
-                self.events[selected_date]):
-            event = self.events[selected_date][row]
-            dialog = EventDialog(
-                self,
-                self.data_manager.employees,
-                self.data_manager.tasks,
-                event)
+        if selected_date in self.events and row < len(self.shown_events):
+            event = self.shown_events[row]
+            dialog = EventDialog(self, self.data_manager, event)
 
             if dialog.exec_():
                 event_data = dialog.get_data()
-                event.update(
+                self.data_manager.update_event(
+                    selected_date,
+                    event,
                     {
                         "title": event_data["title"],
                         "description": event_data["description"],
@@ -1122,19 +2116,28 @@ class CalendarPage(QWidget):
                         "datetime": f"{selected_date} {event_data['time']}",
                     }
                 )
-                self.show_events()
-                self.update_month_view()
-                self.data_manager.save_all_data()
+                self.data_manager.request_save()
 
+    def on_data_changed(self, collection, change, date_str, event):
+        if collection != "events":
+            return
+        selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
+        if change == "reset" or date_str == selected_date:
+            self.show_events()
+        if change == "reset" or date_str[:7] == QDate.currentDate().toString("yyyy-MM"):
+            self.update_month_view()
+
+    @timed
     def show_events(self):
         self.events_list.clear()
+        self.shown_events = []
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
 
         if selected_date in self.events:
-            sorted_events = sorted(
+            self.shown_events = sorted(
                 self.events[selected_date], key=lambda x: x["time"])
 
-            for event in sorted_events:
+            for event in self.shown_events:
                 item_text = f"🕒 {event['time']} | {event['title']} | 👤{event['assignee_name']}"
                 if event.get("task_name"):
                     item_text += f" | 📋{event['task_name']}"
@@ -1145,56 +2148,15 @@ class CalendarPage(QWidget):
                 )
                 self.events_list.addItem(item)
 
-    def check_notifications(self):
-        now = datetime.now()
-
-        for date_str, events in self.events.items():
-            for event in events:
-                event_id = f"{date_str}_{event['time']}_{event['title']}"
-
-                if event_id in self.notified_events:
-                    continue
-
-                try:
-                    event_datetime = datetime.strptime(
-                        event["datetime"], "%Y-%m-%d %H:%M"
-                    )
-                    time_diff = event_datetime - now
-
-                    if timedelta(0) <= time_diff <= timedelta(minutes=10):
-                        self.show_notification(event)
-                        self.notified_events.add(event_id)
-
-                except ValueError:
-                    continue
-
-    def show_notification(self, event):
-        msg = QMessageBox(self)
-        msg.setIcon(QMessageBox.Information)
-        msg.setWindowTitle("🔔 Напоминание о событии")
-        msg.setText(f"Событие: {event['title']}")
-        msg.setInformativeText(
-            f"Время: {event['time']}\nИсполнитель: {event['assignee_name']}\nОписание: {event['description']}"
-        )
-        msg.addButton("ОК", QMessageBox.AcceptRole)
-        msg.addButton("Отложить (5 мин)", QMessageBox.RejectRole)
-
-        msg.setWindowFlags(msg.windowFlags() | Qt.WindowStaysOnTopHint)
-
-        result = msg.exec_()
-
-        if result == QMessageBox.RejectRole:
-            self.notified_events.remove(
-                f"{event['datetime'].split(' ')[0]}_{event['time']}_{event['title']}"
-            )
-
     def export_events(self):
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Экспорт событий", "events_export.json", "JSON Files (*.json)")
         if file_path:
             try:
                 with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(self.events, f, ensure_ascii=False, indent=2)
+                    events = {date: to_plain(date_events)
+                              for date, date_events in self.events.items()}
+                    json.dump(events, f, ensure_ascii=False, indent=2)
                 QMessageBox.information(
                     self, "Успех", "События экспортированы!")
             except Exception as e:
@@ -1204,11 +2166,11 @@ class CalendarPage(QWidget):
 
 class EventDialog(QDialog):
     
-    def __init__(self, parent=None, employees=None, tasks=None, event=None):
+    @timed
+    def __init__(self, parent=None, data_manager=None, event=None):
         super().__init__(parent)
         self.event = event
-        self.employees = employees or []
-        self.tasks = tasks or []
+        self.data_manager = data_manager
         self.init_ui()
 
     def init_ui(self):
@@ -1223,14 +2185,14 @@ class EventDialog(QDialog):
 
         self.task_combo = QComboBox()
         self.task_combo.addItem("Не указана", None)
-        for task in self.tasks:
+        for task in self.data_manager.tasks:
             self.task_combo.addItem(
                 f"{task['text']} ({task['assignee_name']})", task["id"]
             )
 
         self.assignee_combo = QComboBox()
         self.assignee_combo.addItems(
-            [emp["full_name"] for emp in self.employees])
+            [emp["full_name"] for emp in self.data_manager.employees])
 
         self.time_input = QTimeEdit()
         self.time_input.setTime(QTime.currentTime())
@@ -1283,16 +2245,10 @@ class EventDialog(QDialog):
         self.accept()
 
     def get_data(self):
-        assignee = next(
-            (
-                emp
-                for emp in self.employees
-                if emp["full_name"] == self.assignee_combo.currentText()
-            ),
-            None,
-        )
+        assignee = self.data_manager.get_employee_by_name(
+            self.assignee_combo.currentText())
         task_id = self.task_combo.currentData()
-        task = next((t for t in self.tasks if t["id"] == task_id), None)
+        task = self.data_manager.get_task_by_id(task_id)
 
         return {
             "title": self.title_input.text(),
@@ -1310,7 +2266,18 @@ class DashboardPage(QWidget):
     def __init__(self, data_manager):
         super().__init__()
         self.data_manager = data_manager
+        self.aggregates = data_manager.aggregates
         self.init_ui()
+        self.refresh()
+
+        # Счетчики обновляются при каждом изменении данных; частые
+        # изменения подряд перерисовываются один раз
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(100)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.data_manager.subscribe(
+            lambda *change: self.refresh_timer.start())
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -1322,33 +2289,14 @@ class DashboardPage(QWidget):
 
         stats_layout = QHBoxLayout()
 
-        employees_card = self.create_stat_card(
-            "👥 Сотрудники",
-            f"Всего: {len(self.data_manager.employees)}\n"
-            f"Активных: {len([e for e in self.data_manager.employees if e.get('status') == 'Активен'])}",
-            "#2a82da",
-        )
-
-        tasks_card = self.create_stat_card(
-            "✓ Задачи",
-            f"Всего: {len(self.data_manager.tasks)}\n"
-            f"Завершено: {len([t for t in self.data_manager.tasks if t['status'] == 'Завершено'])}",
-            "#27ae60",
-        )
-
-        events_card = self.create_stat_card(
-            "📅 События",
-            f"Запланировано: {sum(len(events) for events in self.data_manager.events.values())}\n"
-            f"Сегодня: {len(self.data_manager.events.get(datetime.now().strftime('%Y-%m-%d'), []))}",
-            "#e74c3c",
-        )
-
-        docs_card = self.create_stat_card(
-            "📁 Документы",
-            f"Всего: {len(self.data_manager.documents)}\n"
-            f"Размер: {sum(doc.get('size', 0) for doc in self.data_manager.documents) // 1024} КБ",
-            "#f39c12",
-        )
+        employees_card, self.employees_label = self.create_stat_card(
+            "👥 Сотрудники", "#2a82da")
+        tasks_card, self.tasks_label = self.create_stat_card(
+            "✓ Задачи", "#27ae60")
+        events_card, self.events_label = self.create_stat_card(
+            "📅 События", "#e74c3c")
+        docs_card, self.docs_label = self.create_stat_card(
+            "📁 Документы", "#f39c12")
 
         stats_layout.addWidget(employees_card)
         stats_layout.addWidget(tasks_card)
@@ -1368,7 +2316,28 @@ class DashboardPage(QWidget):
         layout.addLayout(detail_layout)
         self.setLayout(layout)
 
-    def create_stat_card(self, title, text, color):
+    @timed
+    def refresh(self):
+        aggregates = self.aggregates
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        self.employees_label.setText(
+            f"Всего: {aggregates.employees}\n"
+            f"Активных: {aggregates.active_employees}")
+        self.tasks_label.setText(
+            f"Всего: {aggregates.tasks}\n"
+            f"Завершено: {aggregates.completed_tasks()}")
+        self.events_label.setText(
+            f"Запланировано: {aggregates.events}\n"
+            f"Сегодня: {len(self.data_manager.events.get(today, []))}")
+        self.docs_label.setText(
+            f"Всего: {aggregates.documents}\n"
+            f"Размер: {aggregates.documents_size // 1024} КБ")
+
+        self.update_task_status_chart()
+        self.update_upcoming_events()
+
+    def create_stat_card(self, title, color):
         card = QFrame()
         card.setStyleSheet(
             f"""
@@ -1388,72 +2357,263 @@ class DashboardPage(QWidget):
         layout = QVBoxLayout()
         title_label = QLabel(title)
         title_label.setStyleSheet("font-size: 14px;")
-        text_label = QLabel(text)
+        text_label = QLabel()
         text_label.setStyleSheet("font-size: 12px;")
 
         layout.addWidget(title_label)
         layout.addWidget(text_label)
         card.setLayout(layout)
 
-        return card
+        return card, text_label
 
     def create_task_status_chart(self):
         group = QGroupBox("📈 Статусы задач")
-        layout = QVBoxLayout()
+        self.status_layout = QFormLayout()
+        group.setLayout(self.status_layout)
+        return group
 
-        statuses = {}
-        for task in self.data_manager.tasks:
-            status = task["status"]
-            statuses[status] = statuses.get(status, 0) + 1
-
-        for status, count in statuses.items():
-            percent = (
-                (count / len(self.data_manager.tasks)) * 100
-                if self.data_manager.tasks
-                else 0
-            )
-            row = QHBoxLayout()
-            row.addWidget(QLabel(status))
-            row.addWidget(QLabel(f"{count} ({percent:.1f}%)"))
-            layout.addLayout(row)
+    def update_task_status_chart(self):
+        while self.status_layout.rowCount():
+            self.status_layout.removeRow(0)
 
-        group.setLayout(layout)
-        return group
+        total = self.aggregates.tasks
+        for status, count in self.aggregates.task_statuses.items():
+            percent = (count / total) * 100 if total else 0
+            self.status_layout.addRow(
+                QLabel(status), QLabel(f"{count} ({percent:.1f}%)"))
 
     def create_upcoming_events(self):
         group = QGroupBox("🕐 Ближайшие события")
-        layout = QVBoxLayout()
-
-        today = datetime.now().date()
-        upcoming = []
+        self.upcoming_layout = QVBoxLayout()
+        group.setLayout(self.upcoming_layout)
+        return group
 
-        for date_str, events in self.data_manager.events.items():
-            try:
-                event_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                if event_date >= today:
-                    for event in events:
-                        upcoming.append((date_str, event))
-            except ValueError:
-                continue
+    def update_upcoming_events(self):
+        while self.upcoming_layout.count():
+            self.upcoming_layout.takeAt(0).widget().deleteLater()
 
-        upcoming.sort(key=lambda x: x[0])
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        upcoming = self.data_manager.next_n_events(today, 5)
 
-        for date_str, event in upcoming[:5]:
+        for date_str, event in upcoming:
             event_text = f"{date_str} {event['time']}: {event['title']}"
-            layout.addWidget(QLabel(event_text))
+            self.upcoming_layout.addWidget(QLabel(event_text))
 
         if not upcoming:
-            layout.addWidget(QLabel("Нет предстоящих событий"))
+            self.upcoming_layout.addWidget(QLabel("Нет предстоящих событий"))
 
-        group.setLayout(layout)
-        return group
+
+class DiagnosticsDialog(QDialog):
+
+    STATS_COLUMNS = [
+        "Операция", "Вызовов", "p50, мс", "p95, мс", "p99, мс", "Макс., мс", "Всего, мс"]
+    STATS_KEYS = ["count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "total_ms"]
+    STALL_COLUMNS = ["Место в коде", "Раз", "Всего, мс", "Макс., мс", "Последнее"]
+    SLOWEST_LIMIT = 50
+
+    def __init__(self, parent=None, data_manager=None, watchdog=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        self.watchdog = watchdog
+        self.init_ui()
+        self.update_stats()
+
+    def init_ui(self):
+        self.setWindowTitle("Диагностика")
+        self.resize(820, 760 if self.watchdog is not None else 600)
+
+        layout = QVBoxLayout()
+
+        self.profiling_check = QCheckBox(
+            "Замерять время операций (или запуск с HRMS_PROFILE=1)")
+        self.profiling_check.setChecked(profiler.enabled)
+        self.profiling_check.toggled.connect(self.set_profiling)
+        layout.addWidget(self.profiling_check)
+
+        layout.addWidget(QLabel("Самые медленные операции (по p95):"))
+        self.stats_table = QTableWidget()
+        self.stats_table.setColumnCount(len(self.STATS_COLUMNS))
+        self.stats_table.setHorizontalHeaderLabels(self.STATS_COLUMNS)
+        self.stats_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.stats_table.verticalHeader().setVisible(False)
+        self.stats_table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch)
+        layout.addWidget(self.stats_table)
+
+        if self.watchdog is not None:
+            layout.addWidget(QLabel(
+                "Зависания интерфейса дольше "
+                f"{self.watchdog.threshold * 1000:.0f} мс "
+                "(стек самого долгого - во всплывающей подсказке):"))
+            self.stalls_table = QTableWidget()
+            self.stalls_table.setColumnCount(len(self.STALL_COLUMNS))
+            self.stalls_table.setHorizontalHeaderLabels(self.STALL_COLUMNS)
+            self.stalls_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            self.stalls_table.verticalHeader().setVisible(False)
+            self.stalls_table.horizontalHeader().setSectionResizeMode(
+                0, QHeaderView.Stretch)
+            layout.addWidget(self.stalls_table)
+
+        sizes_layout = QHBoxLayout()
+
+        collections_group = QGroupBox("Коллекции")
+        collections_layout = QFormLayout()
+        self.collection_labels = {}
+        for key, title in (
+            ("employees", "Сотрудники:"),
+            ("tasks", "Задачи:"),
+            ("events", "События:"),
+            ("documents", "Документы:"),
+        ):
+            label = QLabel()
+            self.collection_labels[key] = label
+            collections_layout.addRow(title, label)
+        collections_group.setLayout(collections_layout)
+        sizes_layout.addWidget(collections_group)
+
+        files_group = QGroupBox("Файлы данных")
+        files_layout = QVBoxLayout()
+        self.files_label = QLabel()
+        self.files_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        files_layout.addWidget(self.files_label)
+        files_group.setLayout(files_layout)
+        sizes_layout.addWidget(files_group)
+
+        layout.addLayout(sizes_layout)
+
+        btn_layout = QHBoxLayout()
+        btn_refresh = QPushButton("🔄 Обновить")
+        btn_refresh.clicked.connect(lambda: self.update_stats())
+        btn_reset = QPushButton("🧹 Сбросить замеры")
+        btn_reset.clicked.connect(lambda: self.reset_stats())
+        btn_export = QPushButton("📤 Экспорт в JSONL")
+        btn_export.clicked.connect(lambda: self.export_stats())
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.close)
+
+        btn_layout.addWidget(btn_refresh)
+        btn_layout.addWidget(btn_reset)
+        btn_layout.addWidget(btn_export)
+        btn_layout.addStretch()
+        btn_layout.addWidget(btn_close)
+
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+
+    def set_profiling(self, enabled):
+        profiler.enabled = enabled
+
+    def update_stats(self):
+        rows = profiler.stats()[:self.SLOWEST_LIMIT]
+        self.stats_table.setRowCount(len(rows))
+        for row, stats in enumerate(rows):
+            self.stats_table.setItem(row, 0, QTableWidgetItem(stats["name"]))
+            for column, key in enumerate(self.STATS_KEYS, start=1):
+                value = stats[key]
+                text = str(value) if key == "count" else f"{value:.1f}"
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.stats_table.setItem(row, column, item)
+
+        if self.watchdog is not None:
+            self.update_stalls()
+
+        data_manager = self.data_manager
+        counts = {
+            "employees": len(data_manager.employees),
+            "tasks": len(data_manager.tasks),
+            "events": sum(
+                len(date_events) for date_events in data_manager.events.values()),
+            "documents": len(data_manager.documents),
+        }
+        for key, count in counts.items():
+            self.collection_labels[key].setText(f"{count:,}".replace(",", " "))
+
+        lines = []
+        total = 0
+        for path in data_manager.storage.files():
+            if not os.path.exists(path):
+                continue
+            name = os.path.basename(path)
+            if os.path.isdir(path):
+                # История задач - папка с сегментами, показывается одной строкой
+                files = [os.path.join(path, entry) for entry in os.listdir(path)]
+                size = sum(os.path.getsize(entry) for entry in files)
+                name = f"{name}/ ({len(files)} файлов)"
+            else:
+                size = os.path.getsize(path)
+            total += size
+            lines.append(f"{name}: {format_size(size)}")
+        lines.append(f"Всего: {format_size(total)}")
+        self.files_label.setText("\n".join(lines))
+
+    def update_stalls(self):
+        sites = self.watchdog.report()[:self.SLOWEST_LIMIT]
+        self.stalls_table.setRowCount(len(sites))
+        for row, entry in enumerate(sites):
+            site_item = QTableWidgetItem(entry["site"])
+            site_item.setToolTip("\n".join(entry.get("stack", [])))
+            self.stalls_table.setItem(row, 0, site_item)
+            for column, text in enumerate((
+                str(entry["count"]),
+                f"{entry['total_ms']:.0f}",
+                f"{entry['max_ms']:.0f}",
+                entry.get("last", ""),
+            ), start=1):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.stalls_table.setItem(row, column, item)
+
+    def reset_stats(self):
+        profiler.reset()
+        if self.watchdog is not None:
+            self.watchdog.reset()
+        self.update_stats()
+
+    def export_stats(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт замеров", "profile.jsonl", "JSON Lines (*.jsonl)")
+        if not path:
+            return
+        try:
+            profiler.export(path)
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Ошибка", f"Не удалось экспортировать замеры: {str(e)}")
+
+
+def format_size(size):
+    for unit in ("байт", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "байт" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
 
 
 class MainWindow(QMainWindow):
-    
+
+    PAGE_ATTRIBUTES = (
+        "dashboard_page",
+        "staff_page",
+        "docs_page",
+        "todo_page",
+        "calendar_page",
+    )
+
     def __init__(self):
         super().__init__()
-        self.data_manager = DataManager()
+        self.startup_started = time.perf_counter()
+        self.startup_times = []
+
+        # Данные читаются в фоне, окно показывается сразу с заглушками
+        self.data_manager = DataManager(defer_load=True)
+        self.persistence = PersistenceWorker(self.data_manager)
+        self.data_manager.save_scheduler = self.persistence.request_save
+        self.notifier = EventNotifier(self.data_manager, self)
+        # Следит, не завис ли цикл событий; отчет - data/stall_report.json
+        self.watchdog = create_watchdog(self)
+        if self.watchdog is not None:
+            self.watchdog.start()
         self.setWindowTitle("Система управления персоналом v2.0")
         self.resize(1400, 900)
 
@@ -1468,17 +2628,17 @@ class MainWindow(QMainWindow):
         self.stacked_work_area = QStackedWidget()
         main_layout.addWidget(self.stacked_work_area)
 
-        self.staff_page = StaffPage(self.data_manager)
-        self.docs_page = DocumentsPage(self.data_manager)
-        self.todo_page = TodoPage(self.data_manager)
-        self.calendar_page = CalendarPage(self.data_manager)
-        self.dashboard_page = DashboardPage(self.data_manager)
+        # Страницы создаются при первом открытии
+        self.dashboard_page = None
+        self.staff_page = None
+        self.docs_page = None
+        self.todo_page = None
+        self.calendar_page = None
 
-        self.stacked_work_area.addWidget(self.dashboard_page)
-        self.stacked_work_area.addWidget(self.staff_page)
-        self.stacked_work_area.addWidget(self.docs_page)
-        self.stacked_work_area.addWidget(self.todo_page)
-        self.stacked_work_area.addWidget(self.calendar_page)
+        for index in range(len(self.PAGE_ATTRIBUTES)):
+            placeholder = QLabel("⏳ Загрузка данных...")
+            placeholder.setAlignment(Qt.AlignCenter)
+            self.stacked_work_area.addWidget(placeholder)
 
         self.sidebar.btn_dashboard.clicked.connect(lambda: self.switch_page(0))
         self.sidebar.btn_staff.clicked.connect(lambda: self.switch_page(1))
@@ -1490,15 +2650,89 @@ class MainWindow(QMainWindow):
         self.create_status_bar()
         self.create_tool_bar()
 
+        self.persistence.save_started.connect(self.on_save_started)
+        self.persistence.save_finished.connect(self.on_save_finished)
+
         self.autosave_timer = QTimer()
         self.autosave_timer.timeout.connect(self.auto_save)
         self.autosave_timer.start(300000)
 
+        self.mark_startup("создание окна")
+        QTimer.singleShot(0, lambda: self.mark_startup("окно показано"))
+
+        self.persistence.load_finished.connect(self.on_data_loaded)
+        if self.data_manager.loaded:
+            self.on_data_ready()
+        else:
+            self.persistence.load(self.mark_startup)
+
+    def mark_startup(self, stage):
+        elapsed = (time.perf_counter() - self.startup_started) * 1000
+        self.startup_times.append((stage, elapsed))
+
+    def on_data_loaded(self, error):
+        if error:
+            print(f"Ошибка загрузки данных: {error}")
+            self.data_manager.apply_data({})
+        self.on_data_ready()
+
+    def on_data_ready(self):
+        self.notifier.schedule_reminders()
+        self.data_manager.subscribe(self.notifier.on_data_changed)
+        self.switch_page(self.stacked_work_area.currentIndex())
+        self.mark_startup("первая страница")
+
+        report = ", ".join(
+            f"{stage} {elapsed:.0f} мс" for stage, elapsed in self.startup_times)
+        print(f"Запуск: {report}")
+        self.statusBar().showMessage(f"Запуск: {report}", 10000)
+
+        if self.data_manager.load_errors:
+            QTimer.singleShot(0, self.show_load_errors)
+
+    def page(self, index):
+        attribute = self.PAGE_ATTRIBUTES[index]
+        page = getattr(self, attribute)
+        if page is None:
+            if index == 0:
+                page = DashboardPage(self.data_manager)
+            elif index == 1:
+                page = StaffPage(self.data_manager)
+            elif index == 2:
+                page = DocumentsPage(self.data_manager)
+            elif index == 3:
+                page = TodoPage(self.data_manager)
+            else:
+                page = CalendarPage(self.data_manager)
+
+            placeholder = self.stacked_work_area.widget(index)
+            self.stacked_work_area.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.stacked_work_area.insertWidget(index, page)
+            setattr(self, attribute, page)
+        return page
+
+    def show_load_errors(self):
+        QMessageBox.warning(
+            self,
+            "Ошибка загрузки данных",
+            "Некоторые файлы данных повреждены и были отложены:\n\n"
+            + "\n".join(self.data_manager.load_errors),
+        )
+
     def create_menu_bar(self):
         menu_bar = self.menuBar()
 
         file_menu = menu_bar.addMenu("&Файл")
 
+        export_action = QAction("📤 Экспорт данных в JSON", self)
+        export_action.triggered.connect(self.export_data)
+        file_menu.addAction(export_action)
+
+        import_action = QAction("📥 Импорт данных из JSON", self)
+        import_action.triggered.connect(self.import_data)
+        file_menu.addAction(import_action)
+
         exit_action = QAction("🚪 Выход", self)
         exit_action.triggered.connect(self.close)
 
@@ -1512,6 +2746,10 @@ class MainWindow(QMainWindow):
         view_menu.addAction(toggle_sidebar_action)
 
         help_menu = menu_bar.addMenu("&Помощь")
+        diagnostics_action = QAction("🩺 Диагностика", self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        help_menu.addAction(diagnostics_action)
+
         about_action = QAction("ℹ️ О программе", self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
@@ -1521,7 +2759,9 @@ class MainWindow(QMainWindow):
         toolbar.setIconSize(QSize(16, 16))
         self.addToolBar(toolbar)
 
-        toolbar.addAction("💾 Сохранить все", self.data_manager.save_all_data)
+        toolbar.addAction(
+            "💾 Сохранить все",
+            lambda: self.persistence.request_save(immediate=True))
         toolbar.addAction("🔄 Обновить", self.refresh_all)
         toolbar.addSeparator()
         toolbar.addAction("👥 Сотрудники", lambda: self.switch_page(1))
@@ -1543,6 +2783,8 @@ class MainWindow(QMainWindow):
             self.sidebar.show()
 
     def switch_page(self, index):
+        if self.data_manager.loaded:
+            self.page(index)
         self.stacked_work_area.setCurrentIndex(index)
 
         pages = [
@@ -1554,26 +2796,77 @@ class MainWindow(QMainWindow):
         ]
         self.statusBar().showMessage(f"Режим: {pages[index]}")
 
-        if index == 0:
-            self.dashboard_page.update()
-        elif index == 3:
-            self.todo_page.update_assignee_combo()
-            self.todo_page.update_list()
+        if index == 0 and self.dashboard_page is not None:
+            self.dashboard_page.refresh()
 
     def refresh_all(self):
+        if not self.data_manager.loaded:
+            self.statusBar().showMessage("Данные еще загружаются", 2000)
+            return
+
+        # Страницы и напоминания обновляются по уведомлениям "reset"
+        self.persistence.wait()
         self.data_manager.load_all_data()
-        self.staff_page.update_table()
-        self.todo_page.update_list()
-        self.calendar_page.show_events()
-        self.docs_page.refresh_list()
         self.statusBar().showMessage("Все данные обновлены")
 
+    def export_data(self):
+        if not self.data_manager.loaded:
+            self.statusBar().showMessage("Данные еще загружаются", 2000)
+            return
+
+        folder = QFileDialog.getExistingDirectory(
+            self, "Папка для экспорта данных")
+        if folder:
+            try:
+                self.data_manager.export_json(folder)
+                self.statusBar().showMessage("Данные экспортированы", 2000)
+            except Exception as e:
+                QMessageBox.critical(
+                    self, "Ошибка", f"Не удалось экспортировать данные: {str(e)}")
+
+    def import_data(self):
+        if not self.data_manager.loaded:
+            self.statusBar().showMessage("Данные еще загружаются", 2000)
+            return
+
+        folder = QFileDialog.getExistingDirectory(
+            self, "Папка с файлами данных")
+        if folder:
+            reply = QMessageBox.question(
+                self,
+                "Подтверждение",
+                "Текущие данные будут заменены данными из папки. Продолжить?",
+                QMessageBox.Yes | QMessageBox.No,
+            )
+            if reply == QMessageBox.Yes:
+                try:
+                    self.persistence.wait()
+                    self.data_manager.import_json(folder)
+                    self.data_manager.request_save()
+                    self.statusBar().showMessage("Данные импортированы", 2000)
+                except Exception as e:
+                    QMessageBox.critical(
+                        self, "Ошибка", f"Не удалось импортировать данные: {str(e)}")
+
+    @timed
     def auto_save(self):
-        try:
-            self.data_manager.save_all_data()
-            self.statusBar().showMessage("Данные автоматически сохранены", 2000)
-        except Exception as e:
-            print(f"Ошибка автосохранения: {e}")
+        self.persistence.request_save(immediate=True)
+
+    def on_save_started(self):
+        self.save_indicator.setText("💾 Сохранение...")
+
+    def on_save_finished(self, ok, error):
+        if ok:
+            self.save_indicator.setText(
+                f"💾 Сохранено в {datetime.now().strftime('%H:%M:%S')}")
+            self.save_indicator.setToolTip("")
+        else:
+            self.save_indicator.setText("⚠️ Ошибка сохранения")
+            self.save_indicator.setToolTip(error)
+
+    def show_diagnostics(self):
+        dialog = DiagnosticsDialog(self, self.data_manager, self.watchdog)
+        dialog.exec_()
 
     def show_about(self):
         QMessageBox.about(
@@ -1595,10 +2888,23 @@ class MainWindow(QMainWindow):
             QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
         )
 
+        if reply == QMessageBox.Cancel:
+            event.ignore()
+            return
+
+        if self.docs_page is not None:
+            self.docs_page.importer.shutdown()
+            self.docs_page.watcher.shutdown()
+            # Синхронизация индекса идет в пуле импорта, он уже остановлен
+            if self.docs_page.search_index is not None:
+                self.docs_page.search_index.close()
+        self.persistence.shutdown()
         if reply == QMessageBox.Yes:
             self.data_manager.save_all_data()
-            event.accept()
-        elif reply == QMessageBox.No:
-            event.accept()
-        else:
-            event.ignore()
\ No newline at end of file
+        # При "Нет" пропускается только итоговый снимок: журнал изменений
+        # остается на диске и применится при следующем запуске
+        self.data_manager.close()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        profiler.close()
+        event.accept()
\ No newline at end of file
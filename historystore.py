@@ -0,0 +1,459 @@
+import os
+import sqlite3
+import threading
+import zlib
+
+from operator import itemgetter
+
+
+HISTORY_DIR = "history"
+HISTORY_SEGMENTS = 64
+SEGMENT_PREFIX = "segment-"
+# Длина префикса start_date ("ГГГГ-ММ-ДД ЧЧ:ММ") для подсчета по периодам
+PERIOD_WIDTHS = {"month": 7, "year": 4}
+
+
+class HistoryStore:
+    # История задач хранится отдельно от staff_data.json: сотрудники
+    # распределены по сегментам, каждый сегмент - файл JSONL, в который
+    # только дописываются строки {"e": id сотрудника, ...запись}. Рядом
+    # лежит индекс .idx со смещениями строк и датами начала; он дописывается
+    # лениво, при первом чтении сегмента, поэтому смена задачи стоит одной
+    # записи в файл, а фильтр и сортировка по дате не читают сами записи.
+    # id сотрудника везде приводится к строке: в индексе он текстовый
+
+    def __init__(self, directory, codec, segments=HISTORY_SEGMENTS):
+        self.directory = directory
+        self.codec = codec
+        self.segments = segments
+        self.lock = threading.Lock()
+        self.writers = {}
+        self.indexes = {}
+        self.indexed = {}
+
+    def segment_of(self, emp_id):
+        return zlib.crc32(str(emp_id).encode("utf-8")) % self.segments
+
+    def segment_path(self, segment):
+        return os.path.join(
+            self.directory, f"{SEGMENT_PREFIX}{segment:02d}.jsonl")
+
+    def index_path(self, segment):
+        return os.path.join(
+            self.directory, f"{SEGMENT_PREFIX}{segment:02d}.idx")
+
+    def load(self, emp_id):
+        return self.fetch(emp_id, [offset for offset, _ in self._rows(emp_id)])
+
+    def query(self, emp_id, date_from=None, date_to=None,
+              sort_field="start_date", descending=False):
+        # Возвращает смещения подходящих записей в нужном порядке
+        rows = [
+            row for row in self._rows(emp_id)
+            if in_period(row[1], date_from, date_to)
+        ]
+        if sort_field == "start_date":
+            rows.sort(key=itemgetter(1), reverse=descending)
+            return [offset for offset, _ in rows]
+
+        # Остальных полей в индексе нет: отобранные записи читаются целиком
+        offsets = [offset for offset, _ in rows]
+        keys = [
+            sort_key(entry.get(sort_field))
+            for entry in self.fetch(emp_id, offsets)
+        ]
+        order = sorted(
+            range(len(offsets)), key=keys.__getitem__, reverse=descending)
+        return [offsets[i] for i in order]
+
+    def fetch(self, emp_id, offsets):
+        if not offsets:
+            return []
+        segment = self.segment_of(emp_id)
+        with self.lock:
+            self._flush(segment)
+        entries = []
+        with open(self.segment_path(segment), "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                entry = self.codec.loads(f.readline())
+                del entry["e"]
+                entries.append(entry)
+        return entries
+
+    def period_counts(self, emp_id, date_from=None, date_to=None,
+                      period="month"):
+        width = PERIOD_WIDTHS[period]
+        counts = {}
+        for offset, start_date in self._rows(emp_id):
+            if in_period(start_date, date_from, date_to):
+                key = start_date[:width]
+                counts[key] = counts.get(key, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def count(self, emp_id):
+        segment = self.segment_of(emp_id)
+        with self.lock:
+            return len(self._index(segment).get(str(emp_id), ()))
+
+    def append(self, emp_id, entry):
+        self.extend(emp_id, [entry])
+
+    def extend(self, emp_id, entries):
+        lines = [
+            self.codec.dumps({"e": str(emp_id), **entry}) + "\n"
+            for entry in entries
+        ]
+        self._write(emp_id, lines)
+
+    def merge(self, histories):
+        # Дописывает только записи, которых еще нет у сотрудника, поэтому
+        # прерванный перенос истории можно безопасно повторить
+        histories = {
+            str(emp_id): entries for emp_id, entries in histories.items()}
+        with self.lock:
+            stored = {
+                emp_id: len(self._index(self.segment_of(emp_id)).get(emp_id, ()))
+                for emp_id in histories
+            }
+            written = {}
+            for emp_id, entries in histories.items():
+                lines = [
+                    self.codec.dumps({"e": emp_id, **entry}) + "\n"
+                    for entry in entries[stored[emp_id]:]
+                ]
+                if lines:
+                    segment = self.segment_of(emp_id)
+                    f = written[segment] = self._writer(segment)
+                    f.write("".join(lines).encode("utf-8"))
+            for f in written.values():
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self, emp_id):
+        # Удаление - тоже запись: при чтении все, что было до нее, отбрасывается
+        self._write(emp_id, [
+            self.codec.dumps({"e": str(emp_id), "clear": True}) + "\n"])
+
+    def clear_all(self):
+        with self.lock:
+            self._close_writers()
+            self.indexes.clear()
+            self.indexed.clear()
+            for path in self.files():
+                os.remove(path)
+
+    def items(self):
+        # Вся история сразу - для экспорта и переноса между хранилищами
+        histories = {}
+        for segment in range(self.segments):
+            path = self.segment_path(segment)
+            if not os.path.exists(path):
+                continue
+            with self.lock:
+                self._flush(segment)
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = self.codec.loads(line)
+                    except ValueError:
+                        continue
+                    emp_id = str(entry.pop("e"))
+                    if entry.get("clear"):
+                        histories.pop(emp_id, None)
+                    else:
+                        histories.setdefault(emp_id, []).append(entry)
+        return histories
+
+    def files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in sorted(os.listdir(self.directory))
+            if name.startswith(SEGMENT_PREFIX)
+        ]
+
+    def close(self):
+        with self.lock:
+            self._close_writers()
+
+    def _rows(self, emp_id):
+        segment = self.segment_of(emp_id)
+        with self.lock:
+            return list(self._index(segment).get(str(emp_id), ()))
+
+    def _write(self, emp_id, lines):
+        if not lines:
+            return
+        segment = self.segment_of(emp_id)
+        with self.lock:
+            f = self._writer(segment)
+            f.write("".join(lines).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _writer(self, segment):
+        f = self.writers.get(segment)
+        if f is None:
+            os.makedirs(self.directory, exist_ok=True)
+            f = open(self.segment_path(segment), "ab")
+            # После сбоя в конце могла остаться оборванная строка: новая
+            # запись начинается с новой строки, а обрывок пропускается
+            if f.tell() and not ends_with_newline(self.segment_path(segment)):
+                f.write(b"\n")
+            self.writers[segment] = f
+        return f
+
+    def _flush(self, segment):
+        f = self.writers.get(segment)
+        if f is not None:
+            f.flush()
+
+    def _close_writers(self):
+        for f in self.writers.values():
+            f.close()
+        self.writers.clear()
+
+    def _index(self, segment):
+        # Вызывается под self.lock
+        index = self.indexes.get(segment)
+        if index is None:
+            index, indexed = self._read_index(segment)
+            self.indexes[segment] = index
+            self.indexed[segment] = indexed
+
+        path = self.segment_path(segment)
+        self._flush(segment)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size > self.indexed[segment]:
+            self._catch_up(segment, index, size)
+        return index
+
+    def _read_index(self, segment):
+        index = {}
+        indexed = 0
+        path = self.index_path(segment)
+        if not os.path.exists(path):
+            return index, indexed
+
+        valid = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    emp_id, offset, end, start_date = (
+                        line.decode("utf-8").rstrip("\n").split("\t"))
+                    offset = int(offset)
+                    end = int(end)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                add_offset(index, emp_id, offset, start_date)
+                indexed = end
+                valid += len(line)
+        if valid != os.path.getsize(path):
+            # Оборванная строка индекса: обрезаем, дальше он допишется заново
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+        return index, indexed
+
+    def _catch_up(self, segment, index, size):
+        offset = self.indexed[segment]
+        added = []
+        with open(self.segment_path(segment), "rb") as f:
+            f.seek(offset)
+            while offset < size:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                end = offset + len(line)
+                try:
+                    entry = self.codec.loads(line)
+                    emp_id = str(entry["e"])
+                except (ValueError, KeyError, TypeError):
+                    emp_id = None
+                if emp_id is not None:
+                    row_offset = -1 if entry.get("clear") else offset
+                    start_date = str(entry.get("start_date") or "")
+                    start_date = start_date.replace("\t", " ").replace("\n", " ")
+                    added.append(f"{emp_id}\t{row_offset}\t{end}\t{start_date}\n")
+                    add_offset(index, emp_id, row_offset, start_date)
+                offset = end
+        self.indexed[segment] = offset
+
+        if added:
+            with open(self.index_path(segment), "a", encoding="utf-8") as f:
+                f.write("".join(added))
+
+
+class SqliteHistory:
+    # Та же история в таблице task_history базы SQLite; отдельное соединение,
+    # чтобы запись истории не попадала в транзакцию фонового сохранения
+
+    SORT_COLUMNS = {
+        "start_date": "start_date",
+        "task": "json_extract(data, '$.task')",
+        "end_date": "json_extract(data, '$.end_date')",
+        "type": "json_extract(data, '$.type')",
+    }
+    FETCH_CHUNK = 500
+
+    def __init__(self, path, codec):
+        self.codec = codec
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.lock = threading.Lock()
+
+    def load(self, emp_id):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT data FROM task_history WHERE employee_id = ? ORDER BY seq",
+                (emp_id,),
+            ).fetchall()
+        return [self.codec.loads(data) for (data,) in rows]
+
+    def query(self, emp_id, date_from=None, date_to=None,
+              sort_field="start_date", descending=False):
+        where, params = period_filter(emp_id, date_from, date_to)
+        order = self.SORT_COLUMNS[sort_field] + (" DESC" if descending else "")
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT seq FROM task_history WHERE {where} "
+                f"ORDER BY {order}, seq",
+                params,
+            ).fetchall()
+        return [seq for (seq,) in rows]
+
+    def fetch(self, emp_id, seqs):
+        found = {}
+        with self.lock:
+            for start in range(0, len(seqs), self.FETCH_CHUNK):
+                chunk = seqs[start:start + self.FETCH_CHUNK]
+                found.update(self.conn.execute(
+                    "SELECT seq, data FROM task_history WHERE employee_id = ? "
+                    f"AND seq IN ({', '.join('?' * len(chunk))})",
+                    [emp_id, *chunk],
+                ))
+        return [self.codec.loads(found[seq]) for seq in seqs]
+
+    def period_counts(self, emp_id, date_from=None, date_to=None,
+                      period="month"):
+        where, params = period_filter(emp_id, date_from, date_to)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT substr(COALESCE(start_date, ''), 1, ?) AS period, "
+                f"COUNT(*) FROM task_history WHERE {where} "
+                "GROUP BY period ORDER BY period",
+                [PERIOD_WIDTHS[period], *params],
+            ).fetchall()
+        return dict(rows)
+
+    def count(self, emp_id):
+        with self.lock:
+            (count,) = self.conn.execute(
+                "SELECT COUNT(*) FROM task_history WHERE employee_id = ?",
+                (emp_id,),
+            ).fetchone()
+        return count
+
+    def append(self, emp_id, entry):
+        self.extend(emp_id, [entry])
+
+    def extend(self, emp_id, entries):
+        with self.lock, self.conn:
+            (stored,) = self.conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM task_history "
+                "WHERE employee_id = ?",
+                (emp_id,),
+            ).fetchone()
+            self.conn.executemany(
+                "INSERT INTO task_history (employee_id, seq, start_date, data) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (emp_id, seq, entry.get("start_date"), self.codec.dumps(entry))
+                    for seq, entry in enumerate(entries, start=stored)
+                ],
+            )
+
+    def merge(self, histories):
+        # employee_id в таблице - TEXT, и ключи сравниваются как строки
+        histories = {
+            str(emp_id): entries for emp_id, entries in histories.items()}
+        with self.lock, self.conn:
+            stored = dict(self.conn.execute(
+                "SELECT employee_id, COALESCE(MAX(seq) + 1, 0) FROM task_history "
+                "GROUP BY employee_id"))
+            self.conn.executemany(
+                "INSERT INTO task_history (employee_id, seq, start_date, data) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (emp_id, seq, entry.get("start_date"), self.codec.dumps(entry))
+                    for emp_id, entries in histories.items()
+                    for seq, entry in enumerate(
+                        entries[stored.get(emp_id, 0):], start=stored.get(emp_id, 0))
+                ],
+            )
+
+    def clear(self, emp_id):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM task_history WHERE employee_id = ?", (emp_id,))
+
+    def clear_all(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM task_history")
+
+    def items(self):
+        histories = {}
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT employee_id, data FROM task_history "
+                "ORDER BY employee_id, seq").fetchall()
+        for emp_id, data in rows:
+            histories.setdefault(emp_id, []).append(self.codec.loads(data))
+        return histories
+
+    def files(self):
+        return []
+
+    def close(self):
+        self.conn.close()
+
+
+def period_filter(emp_id, date_from, date_to):
+    where = "employee_id = ?"
+    params = [emp_id]
+    if date_from is not None:
+        where += " AND substr(start_date, 1, 10) >= ?"
+        params.append(date_from)
+    if date_to is not None:
+        where += " AND substr(start_date, 1, 10) <= ?"
+        params.append(date_to)
+    return where, params
+
+
+def add_offset(index, emp_id, offset, start_date):
+    if offset < 0:
+        index.pop(emp_id, None)
+    else:
+        index.setdefault(emp_id, []).append((offset, start_date))
+
+
+def in_period(start_date, date_from, date_to):
+    # Границы - даты "ГГГГ-ММ-ДД" включительно; None - без ограничения
+    day = start_date[:10]
+    if date_from is not None and day < date_from:
+        return False
+    if date_to is not None and day > date_to:
+        return False
+    return True
+
+
+def sort_key(value):
+    return "" if value is None else str(value)
+
+
+def ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
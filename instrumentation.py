@@ -0,0 +1,132 @@
+import functools
+import json
+import os
+import threading
+import time
+
+from collections import deque
+
+
+# Сколько последних замеров каждой операции хранится для перцентилей
+RING_SIZE = 512
+PERCENTILES = (50, 95, 99)
+
+
+class Profiler:
+    # Замеры выключены по умолчанию: тогда timed() стоит одну проверку
+
+    def __init__(self, enabled=False, trace_path=None, ring_size=RING_SIZE):
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.ring_size = ring_size
+        self.lock = threading.Lock()
+        self.trace_file = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.counts = {}
+            self.totals = {}
+            # Максимум за весь сеанс, а не только по последним замерам
+            self.maxima = {}
+
+    def record(self, name, elapsed_ms):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.ring_size)
+            samples.append(elapsed_ms)
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.totals[name] = self.totals.get(name, 0.0) + elapsed_ms
+            if elapsed_ms > self.maxima.get(name, -1.0):
+                self.maxima[name] = elapsed_ms
+            if self.trace_path:
+                self._trace({
+                    "ts": round(time.time(), 3),
+                    "name": name,
+                    "ms": round(elapsed_ms, 3),
+                    "thread": threading.current_thread().name,
+                })
+
+    def stats(self):
+        with self.lock:
+            snapshot = [
+                (name, sorted(samples), self.counts[name], self.totals[name],
+                 self.maxima[name])
+                for name, samples in self.samples.items()
+            ]
+        rows = []
+        for name, samples, count, total, maximum in snapshot:
+            row = {
+                "name": name,
+                "count": count,
+                "total_ms": total,
+                "max_ms": maximum,
+            }
+            for p in PERCENTILES:
+                row[f"p{p}_ms"] = percentile(samples, p)
+            rows.append(row)
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows
+
+    def export(self, path):
+        # Одна строка JSON на операцию; файл дописывается, чтобы
+        # снимки разных сеансов можно было сравнивать
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(path, "a", encoding="utf-8") as f:
+            for row in self.stats():
+                row = {key: round(value, 3) if isinstance(value, float) else value
+                       for key, value in row.items()}
+                f.write(json.dumps({"snapshot": stamp, **row}, ensure_ascii=False))
+                f.write("\n")
+
+    def _trace(self, record):
+        try:
+            if self.trace_file is None:
+                self.trace_file = open(
+                    self.trace_path, "a", encoding="utf-8", buffering=1)
+            self.trace_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Ошибка записи трассы: {e}")
+            self.trace_path = None
+
+    def close(self):
+        with self.lock:
+            if self.trace_file is not None:
+                self.trace_file.close()
+                self.trace_file = None
+
+
+def percentile(samples, p):
+    # samples уже отсортированы; ближайший ранг, без интерполяции
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, round(p / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def create_profiler():
+    enabled = os.environ.get("HRMS_PROFILE", "") not in ("", "0")
+    trace_path = os.environ.get("HRMS_PROFILE_TRACE") or None
+    return Profiler(enabled or bool(trace_path), trace_path)
+
+
+profiler = create_profiler()
+
+
+def timed(func):
+    # Имя операции - "Класс.метод"; для диалогов это их __init__
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.record(name, (time.perf_counter() - started) * 1000)
+
+    return wrapper
@@ -0,0 +1,63 @@
+import bisect
+import mmap
+
+
+PAGE_SIZE = 256 * 1024
+INDEX_BLOCK_SIZE = 1024 * 1024
+PREVIEW_LIMIT = 1024 * 1024
+
+
+class PagedFile:
+
+    def __init__(self, path, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self.file = open(path, "rb")
+        self.size = self.file.seek(0, 2)
+        self.data = b""
+        if self.size:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        # block_lines[i] - число переводов строки до начала i-го блока
+        self.block_lines = [0]
+        self.indexed = self.size == 0
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self.file.close()
+
+    def read_page(self, offset):
+        end = min(offset + self.page_size, self.size)
+        if end < self.size:
+            newline = self.data.find(b"\n", end, end + self.page_size)
+            if newline != -1:
+                end = newline + 1
+            else:
+                # Очень длинная строка: режем по границе символа UTF-8
+                while end > offset and self.data[end] & 0xC0 == 0x80:
+                    end -= 1
+        text = self.data[offset:end].decode("utf-8", errors="replace")
+        return text, end
+
+    def line_offset(self, line):
+        target = line - 1
+        if target <= 0:
+            return 0
+        while self.block_lines[-1] < target and not self.indexed:
+            self._index_next_block()
+
+        block = bisect.bisect_left(self.block_lines, target) - 1
+        offset = block * INDEX_BLOCK_SIZE
+        for _ in range(target - self.block_lines[block]):
+            newline = self.data.find(b"\n", offset)
+            if newline == -1:
+                return None
+            offset = newline + 1
+        return offset if offset < self.size else None
+
+    def _index_next_block(self):
+        start = (len(self.block_lines) - 1) * INDEX_BLOCK_SIZE
+        end = min(start + INDEX_BLOCK_SIZE, self.size)
+        self.block_lines.append(
+            self.block_lines[-1] + self.data[start:end].count(b"\n"))
+        if end >= self.size:
+            self.indexed = True
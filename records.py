@@ -0,0 +1,271 @@
+import sys
+
+
+class Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+
+
+# Поле, которого не было в исходном JSON: при сохранении оно не появится
+MISSING = Missing()
+
+
+class Record:
+    # Записи хранят поля в слотах, а не в словаре на каждый объект, но
+    # поддерживают доступ record["field"] и record.get(), как у dict.
+    # Неизвестные ключи сохраняются в extra, поэтому JSON не теряется.
+    __slots__ = ("extra",)
+    FIELDS = ()
+    INTERNED = ()
+
+    FIELD_SET = frozenset()
+
+    def __init_subclass__(cls):
+        cls.FIELD_SET = frozenset(cls.FIELDS)
+        cls.build = staticmethod(compile_builder(cls))
+
+    def __init__(self, data=(), **values):
+        for field in self.FIELDS:
+            setattr(self, field, MISSING)
+        self.extra = None
+        self.update(data, **values)
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls.build(data)
+
+    def to_dict(self):
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not MISSING:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __getitem__(self, key):
+        if key in self.FIELD_SET:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.FIELD_SET:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if key in self.FIELD_SET:
+            if key in self.INTERNED and value.__class__ is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELD_SET and getattr(self, key) is not MISSING:
+            setattr(self, key, MISSING)
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.FIELD_SET:
+            return getattr(self, key) is not MISSING
+        return self.extra is not None and key in self.extra
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def update(self, data=(), **values):
+        if hasattr(data, "keys"):
+            pairs = [(key, data[key]) for key in data.keys()]
+        else:
+            pairs = data
+        for key, value in pairs:
+            self[key] = value
+        for key, value in values.items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def compile_builder(cls):
+    # Как в dataclasses: конструктор генерируется под набор полей, чтобы
+    # загрузка сотен тысяч записей не шла через getattr/setattr в цикле
+    lines = [
+        "def build(data):",
+        "    record = new(cls)",
+        "    get = data.get",
+    ]
+    for field in cls.FIELDS:
+        if field in cls.INTERNED:
+            lines.append(f"    value = get({field!r}, MISSING)")
+            lines.append(f"    record.{field} = "
+                         "intern(value) if value.__class__ is str else value")
+        else:
+            lines.append(f"    record.{field} = get({field!r}, MISSING)")
+    # Сравнивается набор ключей, а не их число: при пропущенном поле
+    # лишний ключ иначе потерялся бы. Проверка множеств идет на C
+    lines.append("    record.extra = (None if fields.issuperset(data)")
+    lines.append("                    else extra_keys(cls, data))")
+    lines.append("    return record")
+
+    namespace = {
+        "new": object.__new__,
+        "cls": cls,
+        "MISSING": MISSING,
+        "intern": sys.intern,
+        "extra_keys": extra_keys,
+        "fields": cls.FIELD_SET,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace["build"]
+
+
+def extra_keys(cls, data):
+    extra = {
+        key: value for key, value in data.items()
+        if key not in cls.FIELD_SET
+    }
+    return extra or None
+
+
+class TaskHistoryEntry(Record):
+    FIELDS = ("task", "start_date", "end_date", "type")
+    INTERNED = ("type",)
+    __slots__ = FIELDS
+
+
+class Employee(Record):
+    FIELDS = (
+        "id",
+        "full_name",
+        "birth_date",
+        "position",
+        "current_task",
+        "task_history",
+        "status",
+    )
+    INTERNED = ("position", "status")
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        record = super().from_dict(data)
+        if record.task_history:
+            record.task_history = [
+                TaskHistoryEntry.from_dict(entry)
+                for entry in record.task_history
+            ]
+        return record
+
+    def __setitem__(self, key, value):
+        if key == "task_history" and value:
+            value = [TaskHistoryEntry.from_dict(entry) for entry in value]
+        super().__setitem__(key, value)
+
+    def to_dict(self):
+        data = super().to_dict()
+        if self.task_history:
+            data["task_history"] = to_plain(self.task_history)
+        return data
+
+
+class Task(Record):
+    FIELDS = (
+        "id",
+        "text",
+        "assignee_id",
+        "assignee_name",
+        "status",
+        "priority",
+        "created",
+        "deadline",
+    )
+    INTERNED = ("assignee_id", "status", "priority")
+    __slots__ = FIELDS
+
+
+class CalendarEvent(Record):
+    FIELDS = (
+        "id",
+        "title",
+        "description",
+        "task_id",
+        "task_name",
+        "assignee_id",
+        "assignee_name",
+        "time",
+        "datetime",
+        "created",
+    )
+    INTERNED = ("assignee_id", "time")
+    __slots__ = FIELDS
+
+
+class Document(Record):
+    FIELDS = ("name", "path", "sha256", "size", "modified", "type")
+    INTERNED = ("type",)
+    __slots__ = FIELDS
+
+
+RECORD_TYPES = {
+    "employees": Employee,
+    "tasks": Task,
+    "events": CalendarEvent,
+    "documents": Document,
+}
+
+
+def from_collection(collection, payload):
+    record_type = RECORD_TYPES[collection]
+    if collection == "events":
+        return {
+            date: [record_type.from_dict(event) for event in date_events]
+            for date, date_events in payload.items()
+        }
+    return [record_type.from_dict(row) for row in payload]
+
+
+def to_plain(value):
+    # Записи и вложенные списки превращаются в dict/list для JSON
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
@@ -0,0 +1,72 @@
+import heapq
+import itertools
+
+from datetime import datetime, timedelta
+
+from eventindex import DATETIME_FORMAT, event_datetime
+
+
+REMINDER_LEAD = timedelta(minutes=10)
+SNOOZE_DELAY = timedelta(minutes=5)
+
+
+class ReminderQueue:
+
+    def __init__(self):
+        self.heap = []
+        self.serials = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.serials)
+
+    def clear(self):
+        self.heap.clear()
+        self.serials.clear()
+
+    def schedule(self, date, event, now=None):
+        self.cancel(event)
+        try:
+            start = datetime.strptime(
+                event_datetime(date, event), DATETIME_FORMAT)
+        except ValueError:
+            return
+        if start < (now or datetime.now()):
+            return
+        self._push(start - REMINDER_LEAD, date, event)
+
+    def snooze(self, date, event, now=None):
+        self.cancel(event)
+        self._push((now or datetime.now()) + SNOOZE_DELAY, date, event)
+
+    def cancel(self, event):
+        # Запись остаётся в куче и отбрасывается, когда до неё дойдёт очередь
+        self.serials.pop(id(event), None)
+
+    def next_due(self):
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            when, serial, date, event = heapq.heappop(self.heap)
+            if self.serials.get(id(event)) == serial:
+                del self.serials[id(event)]
+                due.append((date, event))
+        return due
+
+    def _push(self, when, date, event):
+        serial = next(self.counter)
+        self.serials[id(event)] = serial
+        heapq.heappush(self.heap, (when, serial, date, event))
+        if len(self.heap) > 2 * len(self.serials) + 64:
+            self.heap = [entry for entry in self.heap if self._is_live(entry)]
+            heapq.heapify(self.heap)
+
+    def _drop_stale(self):
+        while self.heap and not self._is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+
+    def _is_live(self, entry):
+        return self.serials.get(id(entry[3])) == entry[1]
@@ -0,0 +1,77 @@
+class SearchIndex:
+
+    def __init__(self, fields, key="id"):
+        self.fields = fields
+        self.key = key
+        self.keys = {}
+        self.trigrams = {}
+        self.last_query = None
+        self.last_result = None
+
+    def clear(self):
+        self.keys.clear()
+        self.trigrams.clear()
+        self.last_query = None
+        self.last_result = None
+
+    def add(self, record):
+        record_id = record[self.key]
+        parts = [str(record.get(field) or "").casefold() for field in self.fields]
+        self.keys[record_id] = "\n".join(parts)
+        for gram in set(gram for part in parts for gram in trigrams(part)):
+            self.trigrams.setdefault(gram, set()).add(record_id)
+        self.last_query = None
+
+    def remove(self, record):
+        record_id = record[self.key]
+        text = self.keys.pop(record_id, None)
+        if text is None:
+            return
+        for gram in set(trigrams(text)):
+            ids = self.trigrams.get(gram)
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:
+                    del self.trigrams[gram]
+        self.last_query = None
+
+    def search(self, query):
+        query = query.casefold()
+        if not query:
+            self.last_query = None
+            self.last_result = None
+            return None
+
+        if self.last_query is not None and query.startswith(self.last_query):
+            # Пользователь дописывает запрос: сужаем предыдущий результат
+            candidates = self.last_result
+        elif len(query) >= 3:
+            candidates = self._trigram_candidates(query)
+        else:
+            candidates = self.keys.keys()
+
+        keys = self.keys
+        result = {record_id for record_id in candidates
+                  if query in keys[record_id]}
+        self.last_query = query
+        self.last_result = result
+        return result
+
+    def matches(self, record_id, query):
+        # Проверка одной записи без пересчета всей выборки
+        query = query.casefold()
+        return not query or query in self.keys.get(record_id, "")
+
+    def _trigram_candidates(self, query):
+        buckets = []
+        for gram in set(trigrams(query)):
+            ids = self.trigrams.get(gram)
+            if not ids:
+                return set()
+            buckets.append(ids)
+        buckets.sort(key=len)
+        return buckets[0].intersection(*buckets[1:])
+
+
+def trigrams(text):
+    return (text[i:i + 3] for i in range(len(text) - 2))
@@ -0,0 +1,193 @@
+import os
+import sys
+import threading
+import time
+import traceback
+
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from codec import create_codec
+from storage import DATA_DIR, atomic_write_json
+
+
+STALL_REPORT_FILE = "stall_report.json"
+DEFAULT_THRESHOLD_MS = 100
+STACK_DEPTH = 20
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StallWatchdog(QObject):
+    # Фоновый поток отправляет в цикл событий GUI пинги; если ответа нет
+    # дольше порога, снимается стек потока GUI. Зависания сводятся по месту
+    # в коде приложения, где он стоял, и пишутся в отчет
+
+    ping = pyqtSignal(int)
+
+    def __init__(self, threshold_ms=DEFAULT_THRESHOLD_MS, report_path=None,
+                 parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.interval = max(self.threshold / 2, 0.005)
+        self.report_path = report_path
+        self.codec = create_codec()
+        # Создается в потоке GUI: его стек и будет сниматься
+        self.gui_thread_id = threading.get_ident()
+
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.sent_at = 0.0
+        self.answered = 0
+        self.capture = None
+        self.report_due = False
+        self.sites = self.load_report()
+
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.ping.connect(self.on_ping, Qt.QueuedConnection)
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(
+            target=self.run, name="stall-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.write_report()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            serial = None
+            with self.lock:
+                if self.answered == self.sent:
+                    self.sent += 1
+                    self.sent_at = time.monotonic()
+                    serial = self.sent
+                else:
+                    waiting = time.monotonic() - self.sent_at
+                    stalled = waiting >= self.threshold and self.capture is None
+
+            if serial is not None:
+                try:
+                    self.ping.emit(serial)
+                except RuntimeError:
+                    # Окно уничтожено без stop(): объект Qt уже удален
+                    return
+            elif stalled:
+                capture = self.capture_stack()
+                with self.lock:
+                    if self.answered != self.sent:
+                        self.capture = capture
+
+            if self.report_due:
+                self.write_report()
+
+    def on_ping(self, serial):
+        with self.lock:
+            self.answered = serial
+            stalled_ms = (time.monotonic() - self.sent_at) * 1000
+            capture = self.capture
+            self.capture = None
+            if capture is not None:
+                self.record(capture, stalled_ms)
+
+    def capture_stack(self):
+        frame = sys._current_frames().get(self.gui_thread_id)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+        return call_site(stack), [
+            f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}: "
+            f"{(entry.line or '').strip()}"
+            for entry in stack
+        ]
+
+    def record(self, capture, stalled_ms):
+        # Вызывается под self.lock
+        site, stack = capture or ("неизвестно", [])
+        entry = self.sites.get(site)
+        if entry is None:
+            entry = self.sites[site] = {
+                "site": site,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+            }
+        entry["count"] += 1
+        entry["total_ms"] += stalled_ms
+        if stalled_ms >= entry["max_ms"]:
+            entry["max_ms"] = stalled_ms
+            entry["stack"] = stack
+        entry["last"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.report_due = True
+
+    def report(self):
+        with self.lock:
+            sites = [dict(entry) for entry in self.sites.values()]
+        sites.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return sites
+
+    def reset(self):
+        with self.lock:
+            self.sites = {}
+            self.report_due = True
+
+    def load_report(self):
+        # Отчет накапливается между запусками
+        if not self.report_path or not os.path.exists(self.report_path):
+            return {}
+        try:
+            with open(self.report_path, "rb") as f:
+                payload = self.codec.decode_file(f.read())
+            return {entry["site"]: entry for entry in payload["sites"]}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ошибка чтения отчета о зависаниях: {e}")
+            return {}
+
+    def write_report(self):
+        self.report_due = False
+        if not self.report_path:
+            return
+        payload = {
+            "threshold_ms": round(self.threshold * 1000),
+            "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "sites": [
+                {key: round(value, 1) if isinstance(value, float) else value
+                 for key, value in entry.items()}
+                for entry in self.report()
+            ],
+        }
+        try:
+            directory = os.path.dirname(self.report_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            atomic_write_json(self.report_path, payload, self.codec)
+        except OSError as e:
+            print(f"Ошибка записи отчета о зависаниях: {e}")
+
+
+def call_site(stack):
+    # Самый глубокий кадр из кода приложения, а не из библиотек
+    for entry in reversed(stack):
+        if os.path.dirname(os.path.abspath(entry.filename)) == PROJECT_DIR:
+            break
+    else:
+        entry = stack[-1]
+    return f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+
+
+def create_watchdog(parent=None):
+    threshold = int(os.environ.get(
+        "HRMS_STALL_THRESHOLD_MS", DEFAULT_THRESHOLD_MS))
+    if threshold <= 0:
+        return None
+    return StallWatchdog(
+        threshold, os.path.join(DATA_DIR, STALL_REPORT_FILE), parent)
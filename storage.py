@@ -0,0 +1,510 @@
+import os
+import sys
+import sqlite3
+
+from datetime import datetime
+
+from codec import create_codec
+from historystore import HISTORY_DIR, HistoryStore, SqliteHistory
+from records import to_plain
+
+
+DATA_DIR = "data"
+SQLITE_FILE = "hrms.db"
+JOURNAL_FILE = "journal.jsonl"
+SEALED_JOURNAL_PREFIX = "journal-"
+
+COLLECTION_FILES = {
+    "employees": "staff_data.json",
+    "tasks": "tasks_data.json",
+    "events": "calendar_events.json",
+    "documents": "documents_data.json",
+}
+
+
+def empty_collection(collection):
+    return {} if collection == "events" else []
+
+
+class JsonStorage:
+    row_level = False
+
+    def __init__(self, data_dir=DATA_DIR, journal=False, codec=None):
+        self.data_dir = data_dir
+        self.journal = journal
+        self.codec = codec or create_codec()
+        self.history = HistoryStore(
+            os.path.join(data_dir, HISTORY_DIR), self.codec)
+        self.journal_file = None
+        self.journal_records = 0
+        self.recovered = set()
+        self.load_errors = []
+
+    def path(self, collection):
+        return os.path.join(self.data_dir, COLLECTION_FILES[collection])
+
+    def load(self):
+        data = {}
+        self.load_errors = []
+        for collection in COLLECTION_FILES:
+            path = self.path(collection)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "rb") as f:
+                    payload = self.codec.decode_file(f.read())
+            except ValueError as e:
+                # Поврежденный файл не перезаписывается, а откладывается в сторону
+                corrupt_path = quarantine(path)
+                self.load_errors.append(
+                    f"{os.path.basename(path)}: {e}. "
+                    f"Файл сохранен как {os.path.basename(corrupt_path)}")
+                continue
+            if collection == "employees":
+                payload = payload.get("employees", [])
+            data[collection] = payload
+
+        if self.journal:
+            segments = self.journal_segments()
+            self.recovered = replay_journal(
+                data, segments, self.codec, self.history)
+            self.journal_records = count_lines(self.journal_path())
+        return data
+
+    def save(self, collection, payload, changes=None):
+        os.makedirs(self.data_dir, exist_ok=True)
+        if collection == "employees":
+            payload = {"employees": payload}
+        atomic_write_json(self.path(collection), payload, self.codec)
+
+    def journal_path(self):
+        return os.path.join(self.data_dir, JOURNAL_FILE)
+
+    def journal_segments(self):
+        if not os.path.isdir(self.data_dir):
+            return []
+        sealed = sorted(
+            name for name in os.listdir(self.data_dir)
+            if name.startswith(SEALED_JOURNAL_PREFIX) and name.endswith(".jsonl")
+        )
+        segments = [os.path.join(self.data_dir, name) for name in sealed]
+        if os.path.exists(self.journal_path()):
+            segments.append(self.journal_path())
+        return segments
+
+    def log(self, record):
+        if not self.journal:
+            return
+        if self.journal_file is None:
+            os.makedirs(self.data_dir, exist_ok=True)
+            self.journal_file = open(
+                self.journal_path(), "a", encoding="utf-8")
+        self.journal_file.write(self.codec.dumps(record) + "\n")
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+        self.journal_records += 1
+
+    def seal_journal(self):
+        # Записи, сделанные после снимка, попадут уже в новый журнал
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        self.journal_records = 0
+
+        path = self.journal_path()
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+
+        sealed = [
+            p for p in self.journal_segments() if p != path]
+        number = 1
+        if sealed:
+            number = int(os.path.basename(sealed[-1])[
+                len(SEALED_JOURNAL_PREFIX):-len(".jsonl")]) + 1
+        sealed_path = os.path.join(
+            self.data_dir, f"{SEALED_JOURNAL_PREFIX}{number:06d}.jsonl")
+        os.replace(path, sealed_path)
+        return sealed_path
+
+    def finish_compaction(self, sealed_path):
+        if sealed_path is None:
+            return
+        for path in self.journal_segments():
+            if path != self.journal_path() and path <= sealed_path:
+                os.remove(path)
+
+    def discard_journal(self):
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        for path in self.journal_segments():
+            os.remove(path)
+        self.journal_records = 0
+
+    def close(self):
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        self.history.close()
+
+    def files(self):
+        paths = [self.path(collection) for collection in COLLECTION_FILES]
+        return paths + self.journal_segments() + [self.history.directory]
+
+
+class SqliteStorage:
+    row_level = True
+    journal = False
+    journal_records = 0
+    recovered = frozenset()
+    load_errors = ()
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS employees (
+            id          TEXT PRIMARY KEY,
+            full_name   TEXT,
+            position    TEXT,
+            status      TEXT,
+            data        TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_employees_full_name
+            ON employees(full_name);
+
+        CREATE TABLE IF NOT EXISTS task_history (
+            employee_id TEXT NOT NULL,
+            seq         INTEGER NOT NULL,
+            start_date  TEXT,
+            data        TEXT NOT NULL,
+            PRIMARY KEY (employee_id, seq)
+        );
+
+        CREATE TABLE IF NOT EXISTS tasks (
+            id          INTEGER PRIMARY KEY,
+            assignee_id TEXT,
+            status      TEXT,
+            priority    TEXT,
+            data        TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_assignee ON tasks(assignee_id);
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, priority);
+
+        CREATE TABLE IF NOT EXISTS events (
+            date        TEXT NOT NULL,
+            seq         INTEGER NOT NULL,
+            datetime    TEXT,
+            assignee_id TEXT,
+            data        TEXT NOT NULL,
+            PRIMARY KEY (date, seq)
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_datetime ON events(datetime);
+        CREATE INDEX IF NOT EXISTS idx_events_assignee ON events(assignee_id);
+
+        CREATE TABLE IF NOT EXISTS documents (
+            name        TEXT PRIMARY KEY,
+            type        TEXT,
+            data        TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path, codec=None):
+        self.path = path
+        self.codec = codec or create_codec()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.history = SqliteHistory(path, self.codec)
+
+    def is_empty(self):
+        for table in ("employees", "tasks", "events", "documents"):
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return False
+        return True
+
+    def load(self):
+        # История задач читается отдельно, через self.history
+        employees = [self.codec.loads(data) for (data,) in self.conn.execute(
+            "SELECT data FROM employees ORDER BY rowid")]
+
+        tasks = [self.codec.loads(data) for (data,) in self.conn.execute(
+            "SELECT data FROM tasks ORDER BY rowid")]
+
+        events = {}
+        for date, data in self.conn.execute(
+                "SELECT date, data FROM events ORDER BY date, seq"):
+            events.setdefault(date, []).append(self.codec.loads(data))
+
+        documents = [self.codec.loads(data) for (data,) in self.conn.execute(
+            "SELECT data FROM documents ORDER BY rowid")]
+
+        return {
+            "employees": employees,
+            "tasks": tasks,
+            "events": events,
+            "documents": documents,
+        }
+
+    def save(self, collection, payload, changes=None):
+        with self.conn:
+            if changes is None:
+                self._replace_collection(collection, payload)
+            else:
+                for key, value in changes.items():
+                    if value is None:
+                        self._delete_row(collection, key)
+                    else:
+                        self._upsert_row(collection, key, value)
+
+    def _replace_collection(self, collection, payload):
+        self.conn.execute(f"DELETE FROM {collection}")
+
+        if collection == "events":
+            for date, date_events in payload.items():
+                self._upsert_row(collection, date, date_events)
+        else:
+            for row in payload:
+                self._upsert_row(collection, row_key(collection, row), row)
+
+    def _delete_row(self, collection, key):
+        if collection == "employees":
+            self.conn.execute("DELETE FROM employees WHERE id = ?", (key,))
+        elif collection == "tasks":
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (key,))
+        elif collection == "events":
+            self.conn.execute("DELETE FROM events WHERE date = ?", (key,))
+        elif collection == "documents":
+            self.conn.execute("DELETE FROM documents WHERE name = ?", (key,))
+
+    def _upsert_row(self, collection, key, row):
+        if collection == "employees":
+            self._upsert_employee(row)
+        elif collection == "tasks":
+            self.conn.execute(
+                "INSERT INTO tasks (id, assignee_id, status, priority, data) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET assignee_id = excluded.assignee_id, "
+                "status = excluded.status, priority = excluded.priority, "
+                "data = excluded.data",
+                (row["id"], row.get("assignee_id"), row.get("status"),
+                 row.get("priority"), self.codec.dumps(row)),
+            )
+        elif collection == "events":
+            self.conn.execute("DELETE FROM events WHERE date = ?", (key,))
+            self.conn.executemany(
+                "INSERT INTO events (date, seq, datetime, assignee_id, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, seq, event.get("datetime"),
+                     event.get("assignee_id"), self.codec.dumps(event))
+                    for seq, event in enumerate(row)
+                ],
+            )
+        elif collection == "documents":
+            self.conn.execute(
+                "INSERT INTO documents (name, type, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET type = excluded.type, "
+                "data = excluded.data",
+                (row["name"], row.get("type"), self.codec.dumps(row)),
+            )
+
+    def _upsert_employee(self, employee):
+        fields = {k: v for k, v in employee.items() if k != "task_history"}
+        self.conn.execute(
+            "INSERT INTO employees (id, full_name, position, status, data) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET full_name = excluded.full_name, "
+            "position = excluded.position, status = excluded.status, "
+            "data = excluded.data",
+            (employee["id"], employee.get("full_name"),
+             employee.get("position"), employee.get("status"),
+             self.codec.dumps(fields)),
+        )
+
+    def log(self, record):
+        pass
+
+    def seal_journal(self):
+        return None
+
+    def finish_compaction(self, sealed_path):
+        pass
+
+    def discard_journal(self):
+        pass
+
+    def close(self):
+        self.history.close()
+        self.conn.close()
+
+    def files(self):
+        return [self.path, self.path + "-wal"]
+
+
+def atomic_write_json(path, payload, codec):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(codec.encode_file(payload))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(os.path.dirname(path))
+
+
+def fsync_directory(directory):
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def quarantine(path):
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    corrupt_path = f"{path}.corrupt-{stamp}"
+    os.replace(path, corrupt_path)
+    return corrupt_path
+
+
+def count_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def replay_journal(data, segments, codec, history=None):
+    rows = {
+        collection: {
+            row_key(collection, row): row
+            for row in data.get(collection, [])
+        }
+        for collection in ("employees", "tasks", "documents")
+    }
+    events = data.setdefault("events", {})
+    touched = set()
+
+    for segment in segments:
+        with open(segment, "rb") as f:
+            for line in f:
+                try:
+                    record = codec.loads(line)
+                except ValueError:
+                    # Оборванная запись в конце журнала после сбоя
+                    break
+                apply_record(rows, events, record, history)
+                touched.add(record["c"])
+
+    for collection in touched & rows.keys():
+        data[collection] = list(rows[collection].values())
+    return touched
+
+
+def apply_record(rows, events, record, history=None):
+    op = record["op"]
+    collection = record["c"]
+    key = record["key"]
+
+    if collection == "events":
+        if op == "delete":
+            events.pop(key, None)
+        else:
+            events[key] = record["value"]
+        return
+
+    table = rows[collection]
+    if op == "put":
+        table[key] = record["value"]
+    elif op == "update":
+        if key in table:
+            table[key].update(record["value"])
+    elif op == "delete":
+        table.pop(key, None)
+        if (collection == "employees" and history is not None
+                and history.count(key)):
+            history.clear(key)
+    elif op == "history_add":
+        # Запись журнала делается до записи в хранилище истории. seq - число
+        # записей до нее: после сбоя между ними запись допишется, а при
+        # повторном проигрывании журнала не задвоится
+        if history is not None and history.count(key) == record["seq"]:
+            history.append(key, record["value"])
+
+
+def row_key(collection, row):
+    if collection in ("employees", "tasks"):
+        return row["id"]
+    if collection == "documents":
+        return row["name"]
+    raise KeyError(f"Коллекция {collection} не хранится построчно")
+
+
+def create_storage(backend=None, data_dir=DATA_DIR, codec=None):
+    backend = backend or os.environ.get("HRMS_STORAGE", "json")
+    codec = codec or create_codec()
+
+    if backend == "json":
+        return JsonStorage(data_dir, journal=True, codec=codec)
+
+    if backend == "sqlite":
+        db_path = os.path.join(data_dir, SQLITE_FILE)
+        is_new = not os.path.exists(db_path)
+        storage = SqliteStorage(db_path, codec)
+        if is_new and storage.is_empty():
+            migrate(JsonStorage(data_dir, journal=True, codec=codec), storage)
+        return storage
+
+    raise ValueError(f"Неизвестный тип хранилища: {backend}")
+
+
+def migrate(source, target):
+    data = source.load()
+    if source.journal:
+        # Журнал источника сворачивается в его снимок: иначе после обратной
+        # выгрузки он применился бы поверх новых файлов и откатил изменения
+        for collection in COLLECTION_FILES:
+            source.save(collection, data.get(collection,
+                                             empty_collection(collection)))
+        source.discard_journal()
+    # Старый журнал в папке назначения относится к прежним файлам
+    target.discard_journal()
+    target.history.merge(source.history.items())
+    move_embedded_history(data.get("employees", []), target.history)
+    for collection in COLLECTION_FILES:
+        target.save(collection, data.get(collection,
+                                         empty_collection(collection)))
+    return data
+
+
+def move_embedded_history(employees, history):
+    # В старых файлах история лежит внутри сотрудника. Записи, которых еще
+    # нет в хранилище истории, дописываются, а поле убирается из сотрудника
+    moved = {}
+    found = False
+    for employee in employees:
+        if "task_history" not in employee:
+            continue
+        found = True
+        if employee["task_history"]:
+            moved[employee["id"]] = to_plain(employee["task_history"])
+        del employee["task_history"]
+    if moved:
+        history.merge(moved)
+    return found
+
+
+if __name__ == "__main__":
+    commands = {
+        "migrate": lambda: migrate(
+            JsonStorage(journal=True), SqliteStorage(os.path.join(DATA_DIR, SQLITE_FILE))),
+        "export": lambda: migrate(
+            SqliteStorage(os.path.join(DATA_DIR, SQLITE_FILE)), JsonStorage()),
+    }
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print("Использование: python storage.py [migrate|export]")
+        sys.exit(1)
+    commands[sys.argv[1]]()